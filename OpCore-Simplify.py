@@ -235,22 +235,22 @@ class OCPE:
             self.ac.acpi_directory = os.path.join(self.result_dir, "EFI", "OC", "ACPI")
             self.ac.smbios_model = smbios_model
             self.ac.lpc_bus_device = self.ac.get_lpc_name()
+            self.ac.defer_ssdt_compile()
 
-            for patch in self.ac.patches:
-                if patch.checked:
-                    if patch.name == "BATP":
-                        patch.checked = getattr(self.ac, patch.function_name)()
-                        self.k.kexts[kext_maestro.kext_data.kext_index_by_name.get("ECEnabler")].checked = patch.checked
-                        continue
+            for patch, acpi_load in self.ac.run_patches():
+                if patch.name == "BATP":
+                    patch.checked = acpi_load
+                    self.k.kexts[kext_maestro.kext_data.kext_index_by_name.get("ECEnabler")].checked = patch.checked
+                    continue
 
-                    acpi_load = getattr(self.ac, patch.function_name)()
+                if not isinstance(acpi_load, dict):
+                    continue
 
-                    if not isinstance(acpi_load, dict):
-                        continue
+                config_data["ACPI"]["Add"].extend(acpi_load.get("Add", []))
+                config_data["ACPI"]["Delete"].extend(acpi_load.get("Delete", []))
+                config_data["ACPI"]["Patch"].extend(acpi_load.get("Patch", []))
 
-                    config_data["ACPI"]["Add"].extend(acpi_load.get("Add", []))
-                    config_data["ACPI"]["Delete"].extend(acpi_load.get("Delete", []))
-                    config_data["ACPI"]["Patch"].extend(acpi_load.get("Patch", []))
+            self.ac.update_ssdt_entries(config_data["ACPI"]["Add"], self.ac.compile_deferred_ssdts())
         
         config_data["ACPI"]["Patch"].extend(self.ac.dsdt_patches)
         config_data["ACPI"]["Patch"] = self.ac.apply_acpi_patches(config_data["ACPI"]["Patch"])
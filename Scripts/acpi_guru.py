@@ -6,15 +6,18 @@ from Scripts.datasets import cpu_data
 from Scripts.datasets import pci_data
 from Scripts import smbios
 from Scripts import dsdt
+from Scripts import file_cache
 from Scripts import run
 from Scripts import utils
 import os
 import binascii
+import copy
 import re
 import tempfile
 import shutil
 import sys
 import plistlib
+from concurrent.futures import ThreadPoolExecutor
 
 class ACPIGuru:
     def __init__(self):
@@ -29,6 +32,10 @@ class ACPIGuru:
         self.smbios_model = None
         self.dsdt = None
         self.lpc_bus_device = None
+        # Maps SSDT names to their .dsl paths while compiling is deferred
+        self.deferred_ssdts = None
+        # Compiled SSDTs are cached by their ASL source and iasl version
+        self.ssdt_cache = file_cache.FileCache(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "Cache", "SSDT"))
         self.osi_strings = {
             "Windows 2000": "Windows 2000",
             "Windows XP": "Windows 2001",
@@ -151,7 +158,7 @@ class ACPIGuru:
             # We got at least one file - let's look for the DSDT specifically
             # and try to load that as-is.  If it doesn't load, we'll have to
             # manage everything with temp folders
-            dsdt_list = [x for x in tables if self.acpi._table_signature(path,x) == "DSDT"]
+            dsdt_list = [x for x in tables if self.acpi._table_signature(path,x) == b"DSDT"]
             if len(dsdt_list) > 1:
                 print("Multiple files with DSDT signature passed:")
                 for d in self.sorted_nicely(dsdt_list):
@@ -178,7 +185,7 @@ class ACPIGuru:
                 # If it loads fine - just return the path
                 # to the parent directory
                 return os.path.dirname(path)
-            if not self.acpi._table_signature(path) == "DSDT":
+            if not self.acpi._table_signature(path) == b"DSDT":
                 # Not a DSDT, we aren't applying pre-patches
                 print("\n{} could not be disassembled!".format(os.path.basename(path)))
                 print("")
@@ -222,20 +229,33 @@ class ACPIGuru:
             target_name = self.get_unique_name(trouble_dsdt,res,name_append="-Patched")
             self.dsdt_patches = []
             print("Iterating patches...\n")
+            # Each candidate applies the next located pre-patch on top of the
+            # ones before it
+            applied = []
+            candidates = []
             for p in self.pre_patches:
                 if not all(x in p for x in ("PrePatch","Comment","Find","Replace")): continue
                 print(" - {}".format(p["PrePatch"]))
                 find = binascii.unhexlify(p["Find"])
                 if d.count(find) == 1:
-                    self.dsdt_patches.append(p) # Retain the patch
-                    repl = binascii.unhexlify(p["Replace"])
-                    print(" --> Located - applying...")
-                    d = d.replace(find,repl) # Replace it in memory
+                    print(" --> Located")
+                    applied.append(p) # Retain the patch
+                    d = d.replace(find,binascii.unhexlify(p["Replace"]))
+                    candidates.append((list(applied),d))
+            if candidates:
+                print("\nVerifying {:,} candidate{}...".format(len(candidates),"" if len(candidates)==1 else "s"))
+                # Candidates iasl could disassemble get the first full loads -
+                # the rest still get one afterward in case the bare probe was
+                # wrong about them
+                probes = self.probe_pre_patches(trouble_dsdt,[x[1] for x in candidates])
+                ordered = [x for x,probed in zip(candidates,probes) if probed]
+                ordered.extend(x for x,probed in zip(candidates,probes) if not probed)
+                for patches,data in ordered:
                     with open(trouble_path,"wb") as f:
-                        f.write(d) # Write the updated file
-                    # Attempt to load again
+                        f.write(data) # Write the updated file
                     if self.acpi.load(trouble_path)[0]:
                         fixed = True
+                        self.dsdt_patches = patches
                         # We got it to load - let's write the patches
                         print("\nDisassembled successfully!\n")
                         #self.make_plist(None, None, patches)
@@ -258,7 +278,7 @@ class ACPIGuru:
         # Let's load the rest of the tables
         if len(tables) > 1:
             print("Loading valid tables in {}...".format(path))
-        loaded_tables,failed = self.acpi.load(temp or path)
+        loaded_tables,failed = self.acpi.load(temp or path, lazy=True)
         if not loaded_tables or failed:
             print("\nFailed to load tables in {}{}\n".format(
                 os.path.dirname(path) if os.path.isfile(path) else path,
@@ -284,6 +304,22 @@ class ACPIGuru:
         self.dsdt = self.acpi.get_dsdt_or_only()
         return path
 
+    def probe_pre_patches(self, table_name, candidates, max_workers=4):
+        # Writes each candidate table to its own folder and has iasl check
+        # them all at once - returns a list of bools in candidate order
+        temp = tempfile.mkdtemp()
+        try:
+            paths = []
+            for i,data in enumerate(candidates):
+                os.makedirs(os.path.join(temp,str(i)))
+                paths.append(os.path.join(temp,str(i),table_name))
+                with open(paths[-1],"wb") as f:
+                    f.write(data)
+            with ThreadPoolExecutor(max_workers=min(max_workers,len(paths))) as executor:
+                return list(executor.map(self.acpi.probe_table,paths))
+        finally:
+            shutil.rmtree(temp,ignore_errors=True)
+
     def _ensure_dsdt(self, allow_any=False):
         # Helper to check conditions for when we have valid tables
         return self.dsdt and ((allow_any and self.acpi.acpi_tables) or (not allow_any and self.acpi.get_dsdt_or_only()))
@@ -305,6 +341,17 @@ class ACPIGuru:
         #
         # Returns a dict with device info - only "valid" parameter is
         # guaranteed.
+        if log_locate:
+            return self._get_sta_var(var,device,dev_hid,dev_name,log_locate,table)
+        if not table: table = self.acpi.get_dsdt_or_only()
+        # Callers tweak the dict they get back - hand out copies
+        return copy.deepcopy(self.acpi.memoize(
+            (id(table),"sta_var",var,device,dev_hid,dev_name),
+            lambda: self._get_sta_var(var,device,dev_hid,dev_name,log_locate,table),
+            table=table
+        ))
+
+    def _get_sta_var(self,var,device,dev_hid,dev_name,log_locate,table):
         has_var = False
         patches = []
         root = None
@@ -347,7 +394,7 @@ class ACPIGuru:
         # Let's find out of we need a unique patch for _STA -> XSTA
         if sta and not has_var:
             #print(" --> Generating _STA to XSTA rename")
-            sta_index = self.acpi.find_next_hex(sta[0][1],table=table)[1]
+            sta_index = self.acpi.get_next_hex_index(sta[0][1],table=table)
             #print(" ----> Found at index {}".format(sta_index))
             sta_hex  = "5F535441" # _STA
             xsta_hex = "58535441" # XSTA
@@ -356,6 +403,15 @@ class ACPIGuru:
         return {"valid":True,"has_var":has_var,"sta":sta,"patches":patches,"device":dev,"dev_name":dev_name,"dev_hid":dev_hid,"root":root,"sta_type":sta_type}
 
     def get_lpc_name(self,log=False,skip_ec=False,skip_common_names=False):
+        if not log:
+            # Nothing to print - reuse the last lookup if the tables haven't changed
+            return self.acpi.memoize(
+                ("lpc_name",skip_ec,skip_common_names),
+                lambda: self._get_lpc_name(log,skip_ec,skip_common_names)
+            )
+        return self._get_lpc_name(log,skip_ec,skip_common_names)
+
+    def _get_lpc_name(self,log,skip_ec,skip_common_names):
         # Intel devices appear to use _ADR, 0x001F0000
         # AMD devices appear to use _ADR, 0x00140003
         if log: print("Locating LPC(B)/SBRG...")
@@ -386,8 +442,7 @@ class ACPIGuru:
                     # Get the path minus ._ADR
                     lpc_name = path[0][:-5]
                     # Make sure the LPCB device does not have an _HID
-                    lpc_hid = lpc_name+"._HID"
-                    if any(x[0]==lpc_hid for x in table.get("paths",[])):
+                    if self.acpi.has_path(lpc_name+"._HID",table=table):
                         continue
                     if log: print(" - Found {} in {}".format(lpc_name,table_name))
                     return lpc_name
@@ -569,60 +624,6 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "CpuPlugA", 0x00003000)
                 ]
             }
 
-    def list_irqs(self):
-        # Walks the DSDT keeping track of the current device and
-        # saving the IRQNoFlags if found
-        devices = {}
-        current_device = None
-        current_hid = None
-        irq = False
-        last_irq = False
-        irq_index = 0
-        for index,line in enumerate(self.dsdt["lines"]):
-            if self.acpi.is_hex(line):
-                # Skip all hex lines
-                continue
-            if irq:
-                # Get the values
-                num = line.split("{")[1].split("}")[0].replace(" ","")
-                num = "#" if not len(num) else num
-                if current_device in devices:
-                    if last_irq: # In a row
-                        devices[current_device]["irq"] += ":"+num
-                    else: # Skipped at least one line
-                        irq_index = self.acpi.find_next_hex(index)[1]
-                        devices[current_device]["irq"] += "-"+str(irq_index)+"|"+num
-                else:
-                    irq_index = self.acpi.find_next_hex(index)[1]
-                    devices[current_device] = {"irq":str(irq_index)+"|"+num}
-                irq = False
-                last_irq = True
-            elif "Device (" in line:
-                # Check if we retain the _HID here
-                if current_device and current_device in devices and current_hid:
-                    # Save it
-                    devices[current_device]["hid"] = current_hid
-                last_irq = False
-                current_hid = None
-                try: current_device = line.split("(")[1].split(")")[0]
-                except:
-                    current_device = None
-                    continue
-            elif "_HID, " in line and current_device:
-                try: current_hid = line.split('"')[1]
-                except: pass
-            elif "IRQNoFlags" in line and current_device:
-                # Next line has our interrupts
-                irq = True
-            # Check if just a filler line
-            elif len(line.replace("{","").replace("}","").replace("(","").replace(")","").replace(" ","").split("//")[0]):
-                # Reset last IRQ as it's not in a row
-                last_irq = False
-        # Retain the final _HID if needed
-        if current_device and current_device in devices and current_hid:
-            devices[current_device]["hid"] = current_hid
-        return devices
-
     def get_irq_choice(self, irqs):
         names_and_hids = [
             "PIC",
@@ -651,12 +652,15 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "CpuPlugA", 0x00003000)
         # 22 XX XX (single IRQNoFlags entry)
         # 
         # Can end with 79 [00] (end of method), 86 09 (middle of method) or 47 01 (unknown)
+        #
+        # irq is the list of groups from get_irq_resources(), which already
+        # have the bitmasks
         lines = []
         remd  = []
-        for a in irq.split("-"):
-            index,i = a.split("|") # Get the index
-            index = int(index)
-            find = self.get_int_for_line(i)
+        for group in irq:
+            index = group["index"]
+            i = ":".join(group["irqs"])
+            find = list(group["masks"])
             repl = [0]*len(find)
             # Now we need to verify if we're patching *all* IRQs, or just some specifics
             if rem_irq:
@@ -682,29 +686,10 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "CpuPlugA", 0x00003000)
             lines.append(d)
         return lines
     
-    def get_int_for_line(self, irq):
-        irq_list = []
-        for i in irq.split(":"):
-            irq_list.append(self.same_line_irq(i))
-        return irq_list
-
     def convert_irq_to_int(self, irq):
         b = "0"*(16-irq)+"1"+"0"*(irq)
         return int(b,2)
 
-    def same_line_irq(self, irq):
-        # We sum the IRQ values and return the int
-        total = 0
-        for i in irq.split(","):
-            if i == "#":
-                continue # Null value
-            try: i=int(i)
-            except: continue # Not an int
-            if i > 15 or i < 0:
-                continue # Out of range
-            total = total | self.convert_irq_to_int(i)
-        return total
-    
     def fix_irq_conflicts(self):
         hpets = self.acpi.get_device_paths_with_hid("PNP0103")
         hpet_fake = not hpets
@@ -723,7 +708,7 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "CpuPlugA", 0x00003000)
             if not hpet:
                 return
 
-            crs_index = self.acpi.find_next_hex(hpet[0][1])[1]
+            crs_index = self.acpi.get_next_hex_index(hpet[0][1])
 
             mem_base = mem_length = primed = None
             for line in self.acpi.get_scope(hpets[0][1],strip_comments=True):
@@ -769,7 +754,7 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "CpuPlugA", 0x00003000)
             if not name:
                 return
             
-        devs = self.list_irqs()
+        devs = self.acpi.get_irq_resources(table=self.dsdt)
         target_irqs = self.get_irq_choice(devs)
         if target_irqs is None: return # Bailed, going to the main menu
         # Let's apply patches as we go
@@ -779,7 +764,7 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "CpuPlugA", 0x00003000)
         for dev in devs:
             if not dev in target_irqs:
                 continue
-            irq_patches = self.get_hex_from_irqs(devs[dev]["irq"],target_irqs[dev])
+            irq_patches = self.get_hex_from_irqs(devs[dev]["groups"],target_irqs[dev])
             i = [x for x in irq_patches if x["changed"]]
             for a,t in enumerate(i):
                 if not t["changed"]:
@@ -1031,7 +1016,7 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "HPET", 0x00000000)
                         crs_lines.append(line)
                 if rtc_range_needed: # We need to generate a rename for _CRS -> XCRS
                     #print(" --> Generating _CRS to XCRS rename...")
-                    crs_index = self.acpi.find_next_hex(rtc_crs[0][1])[1]
+                    crs_index = self.acpi.get_next_hex_index(rtc_crs[0][1])
                     #print(" ----> Found at index {}".format(crs_index))
                     crs_hex  = "5F435253" # _CRS
                     xcrs_hex = "58435253" # XCRS
@@ -1210,7 +1195,9 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "RTCAWAC", 0x00000000)
         #self.patch_warn()
         #self.u.grab("Press [enter] to return...")
         
-        if self.write_ssdt(ssdt_name, ssdt):
+        # The renames below are only safe if the SSDT builds, so this one
+        # can't wait for the deferred compile
+        if self.write_ssdt(ssdt_name, ssdt, defer=False):
             return {
                 "Add": [
                     {
@@ -1271,9 +1258,12 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "RTCAWAC", 0x00000000)
         patches = []
         lpc_name = None
         ec_located = False
+        ec_devices = {}
+        for table_name, device in self.acpi.get_devices_with_hid("PNP0C09"):
+            ec_devices.setdefault(table_name,[]).append(device)
         for table_name in self.sorted_nicely(list(self.acpi.acpi_tables)):
             table = self.acpi.acpi_tables[table_name]
-            ec_list = self.acpi.get_device_paths_with_hid("PNP0C09",table=table)
+            ec_list = ec_devices.get(table_name,[])
             if len(ec_list):
                 lpc_name = ".".join(ec_list[0][0].split(".")[:-1])
                 #print(" - Got {:,} in {}".format(len(ec_list),table_name))
@@ -1454,19 +1444,40 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "EC", 0x00001000)
         else:
             return plistlib.Data(data+b"\x00"*(max(pad_to-len(data),0)))
 
-    def write_ssdt(self, ssdt_name, ssdt_content, compile=True):
+    def write_ssdt(self, ssdt_name, ssdt_content, compile=True, defer=True):
         dsl_path = os.path.join(self.acpi_directory, ssdt_name + ".dsl")
-        aml_path = os.path.join(self.acpi_directory, ssdt_name + ".aml")
 
-        if not os.path.exists(self.acpi_directory):
-            os.makedirs(self.acpi_directory)
+        os.makedirs(self.acpi_directory, exist_ok=True)
+
+        if compile:
+            # Identical sources compile to identical AML - skip iasl on a hit
+            aml = self.ssdt_cache.get(self.get_ssdt_cache_key(ssdt_content))
+            if aml:
+                with open(os.path.join(self.acpi_directory, ssdt_name + ".aml"),"wb") as f:
+                    f.write(aml)
+                if self.deferred_ssdts is not None:
+                    self.deferred_ssdts.pop(ssdt_name, None)
+                if os.path.exists(dsl_path):
+                    os.remove(dsl_path)
+                return True
 
         with open(dsl_path,"w") as f:
             f.write(ssdt_content)
 
         if not compile:
             return False
-        
+
+        if self.deferred_ssdts is not None and defer:
+            # Queued for compile_deferred_ssdts() - assume it builds until then.
+            # Callers that need to know whether it builds pass defer=False
+            self.deferred_ssdts[ssdt_name] = dsl_path
+            return True
+
+        return self.compile_ssdt(dsl_path)
+
+    def compile_ssdt(self, dsl_path):
+        aml_path = os.path.splitext(dsl_path)[0] + ".aml"
+
         output = self.run({
             "args":[self.acpi.iasl, dsl_path]
         })
@@ -1474,10 +1485,83 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "EC", 0x00001000)
         if output[-1] != 0:
             return False
         else:
+            self.cache_compiled_ssdt(dsl_path)
             os.remove(dsl_path)
         
         return os.path.exists(aml_path)
 
+    def get_ssdt_cache_key(self, ssdt_content):
+        return self.ssdt_cache.get_key("SSDT", self.acpi.get_iasl_version(), ssdt_content)
+
+    def cache_compiled_ssdt(self, dsl_path):
+        aml_path = os.path.splitext(dsl_path)[0] + ".aml"
+
+        try:
+            with open(dsl_path,"r") as f:
+                ssdt_content = f.read()
+            with open(aml_path,"rb") as f:
+                aml = f.read()
+        except Exception:
+            return False
+
+        return self.ssdt_cache.set(self.get_ssdt_cache_key(ssdt_content), aml)
+
+    def defer_ssdt_compile(self):
+        self.deferred_ssdts = {}
+
+    def compile_deferred_ssdts(self, max_workers=4):
+        # Compiles every queued SSDT with a single iasl call, then retries any
+        # that didn't build on their own in case one bad file stopped the rest.
+        # Returns a dict of SSDT names and whether they compiled
+        queued = self.deferred_ssdts or {}
+        self.deferred_ssdts = None
+        results = {}
+
+        if not queued:
+            return results
+
+        for dsl_path in queued.values():
+            aml_path = os.path.splitext(dsl_path)[0] + ".aml"
+            if os.path.exists(aml_path):
+                os.remove(aml_path)
+
+        self.run({
+            "args":[self.acpi.iasl] + list(queued.values())
+        })
+
+        retry = []
+        for ssdt_name, dsl_path in queued.items():
+            if os.path.exists(os.path.splitext(dsl_path)[0] + ".aml"):
+                self.cache_compiled_ssdt(dsl_path)
+                os.remove(dsl_path)
+                results[ssdt_name] = True
+            else:
+                retry.append(ssdt_name)
+
+        if retry:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(retry))) as executor:
+                for ssdt_name, compiled in zip(retry, executor.map(lambda x: self.compile_ssdt(queued[x]), retry)):
+                    results[ssdt_name] = compiled
+
+        return results
+
+    def update_ssdt_entries(self, add_entries, results):
+        # Sets the Enabled flag of each ACPI Add entry from the compile results
+        for entry in add_entries:
+            ssdt_name = os.path.splitext(entry.get("Path", ""))[0]
+            if ssdt_name in results:
+                entry["Enabled"] = results[ssdt_name]
+
+    def run_patches(self):
+        # Runs every checked patch in order and returns (patch, result)
+        # tuples.  The patches themselves are pure-Python table walks and
+        # their SSDTs compile together afterward, so they run one at a time
+        #
+        # Nearly every patch walks all of the tables, so parse any deferred
+        # ones up front
+        self.acpi.materialize_tables()
+        return [(patch, getattr(self, patch.function_name)()) for patch in self.patches if patch.checked]
+
     def apply_acpi_patches(self, acpi_patches):
         acpi_patches = [
             {
@@ -1810,33 +1894,8 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "[[ALSName]]", 0x00000000)
             "Patch": patches
         }
     
-    def findall_power_resource_blocks(self, table_lines):
-        power_resource_blocks = []
-
-        i = 0
-        while i < len(table_lines):
-            line = table_lines[i].strip()
-            if line.startswith("PowerResource"):
-                start_index = i
-                open_brackets = 1
-                i += 1
-                while i < len(table_lines) and open_brackets > 0:
-                    if '{' in table_lines[i]:
-                        open_brackets += table_lines[i].count('{')
-                    if '}' in table_lines[i]:
-                        open_brackets -= table_lines[i].count('}')
-                    i += 1
-                end_index = i - 1
-                power_resource_blocks.append((start_index, end_index))
-            else:
-                i += 1
-
-        return power_resource_blocks
-
-    def is_method_in_power_resource(self, method, table_lines):
-        power_resource_blocks = self.findall_power_resource_blocks(table_lines)
-        
-        for start, end in power_resource_blocks:
+    def is_method_in_power_resource(self, method, table):
+        for start, end in self.acpi.get_power_resource_blocks(table=table):
             if start <= method[1] <= end:
                 return True
         return False
@@ -1857,11 +1916,11 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "[[ALSName]]", 0x00000000)
 
                 off_method_found = ps3_method_found = False
                 for table_name, table_data in self.acpi.acpi_tables.items():
-                    off_methods = self.acpi.get_method_paths("_OFF", table_data)
-                    ps3_methods = self.acpi.get_method_paths("_PS3", table_data)
+                    off_methods = self.acpi.get_descendant_paths(target_device, obj="_OFF", obj_type="Method", table=table_data)
+                    ps3_methods = self.acpi.get_descendant_paths(target_device, obj="_PS3", obj_type="Method", table=table_data)
 
-                    off_method_found = off_method_found or any(method[0].startswith(target_device) and not self.is_method_in_power_resource(method, table_data.get("lines")) for method in off_methods)
-                    ps3_method_found = ps3_method_found or any(method[0].startswith(target_device) for method in ps3_methods)
+                    off_method_found = off_method_found or any(not self.is_method_in_power_resource(method, table_data) for method in off_methods)
+                    ps3_method_found = ps3_method_found or bool(ps3_methods)
                 
                 if not off_method_found and not ps3_method_found:
                     continue
@@ -2054,15 +2113,16 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "DNVMe", 0x00000000)
 
         for table_name in self.sorted_nicely(list(self.acpi.acpi_tables)):
             table = self.acpi.acpi_tables[table_name]
+            nbcf = self.acpi.find_signatures(["084E4243460A00","084E42434600"],table=table)
 
-            if binascii.unhexlify("084E4243460A00") in table.get("raw"):
+            if nbcf["084E4243460A00"]:
                 patches.append({
                     "Comment": "NBCF 0x00 to 0x01",
                     "Find": "084E4243460A00",
                     "Replace": "084E4243460A01"
                 })
                 break
-            elif binascii.unhexlify("084E42434600") in table.get("raw"):
+            elif nbcf["084E42434600"]:
                 patches.append({
                     "Comment": "NBCF Zero to One",
                     "Find": "084E42434600",
@@ -2343,7 +2403,7 @@ DefinitionBlock ("", "SSDT", 2, "ACDT", "PMCR", 0x00001000)
         }
 
     def fix_hp_005_post_error(self):
-        if binascii.unhexlify("4701700070000108") in self.dsdt.get("raw"):
+        if self.acpi.get_signature_offsets("4701700070000108", self.dsdt):
             return {
                 "Patch": [
                     {
@@ -2532,8 +2592,9 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "RtcRange", 0x00000000)
         xprw_method = "5850525702"
 
         patches = []
+        signatures = self.acpi.find_signatures([uswe_object, wole_object, gprw_method, uprw_method], self.dsdt)
 
-        if binascii.unhexlify(gprw_method) in self.dsdt.get("raw"):
+        if signatures[gprw_method]:
             patches.append({
                 "Comment": "GPRW to XPRW Rename",
                 "Find": gprw_method,
@@ -2541,7 +2602,7 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "RtcRange", 0x00000000)
             })
         else:
             gprw_method = None
-        if binascii.unhexlify(uprw_method) in self.dsdt.get("raw"):
+        if signatures[uprw_method]:
             patches.append({
                 "Comment": "UPRW to XPRW Rename",
                 "Find": uprw_method,
@@ -2549,9 +2610,9 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "RtcRange", 0x00000000)
             })
         else:
             uprw_method = None
-        if not binascii.unhexlify(uswe_object) in self.dsdt.get("raw"):
+        if not signatures[uswe_object]:
             uswe_object = None
-        if not binascii.unhexlify(wole_object) in self.dsdt.get("raw"):
+        if not signatures[wole_object]:
             wole_object = None
         
         ssdt_content = """
@@ -2698,6 +2759,8 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "UNC", 0x00000000)
 
     def operating_system_patch(self):
         ssdt_name = "SSDT-XOSI"
+        osi_signatures = dict((osi_string, binascii.hexlify(osi_string.encode()).decode().upper()) for osi_string in self.osi_strings.values())
+        osi_offsets = self.acpi.find_signatures(list(osi_signatures.values()), self.dsdt)
         ssdt_content = """
 // Resource: https://github.com/dortania/Getting-Started-With-ACPI/blob/master/extra-files/decompiled/SSDT-XOSI.dsl
 
@@ -2722,7 +2785,7 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "XOSI", 0x00001000)
             Return (_OSI (Arg0))
         }
     }
-}""".replace("[[OSIStrings]]", "\n,".join(["            \"{}\"".format(osi_string) for target_os, osi_string in self.osi_strings.items() if osi_string in self.dsdt.get("table")]))
+}""".replace("[[OSIStrings]]", "\n,".join(["            \"{}\"".format(osi_string) for target_os, osi_string in self.osi_strings.items() if osi_offsets[osi_signatures[osi_string]]]))
         
         patches = []
 
@@ -2889,133 +2952,16 @@ DefinitionBlock ("", "SSDT", 2, "ZPSS", "SURFACE", 0x00001000)
             ]
         }
 
-    def find_line_start(self, text, index):
-        current_idx = index
-        while current_idx > 0:
-            if text[current_idx] == '\n':
-                return current_idx + 1
-            current_idx -= 1
-        return 0
-
-    def extract_line(self, text, index):
-        start_idx = self.find_line_start(text, index)
-        end_idx = text.index("\n", start_idx) + 1 if "\n" in text[start_idx:] else len(text)
-        return text[start_idx:end_idx].strip(), start_idx, end_idx
-
-    def extract_block_content(self, text, start_idx):
-        try:
-            block_start = text.index("{", start_idx)
-            
-            brace_count = 1
-            pos = block_start + 1
-            
-            while brace_count > 0 and pos < len(text):
-                if text[pos] == '{':
-                    brace_count += 1
-                elif text[pos] == '}':
-                    brace_count -= 1
-                pos += 1
-            
-            if brace_count == 0:
-                return text[block_start:pos]
-        except ValueError as e:
-            pass
-
-        return ""
-
-    def parse_field_line(self, line):
-        try:
-            if "//" in line:
-                line = line.split("//")[0].strip()
-            
-            parts = line.split(",")
-            
-            if len(parts) >= 2:
-                field_name = parts[0].strip()
-                
-                size_part = parts[1].strip()
-                try:
-                    field_size = int(size_part)
-                except ValueError:
-                    return None, None
-                        
-                return field_name, field_size
-        except (ValueError, IndexError) as e:
-            pass
-        
-        return None, None
-
-    def process_embedded_control_region(self, table, start_idx):
-        try:
-            embed_control_idx = table.index("EmbeddedControl", start_idx)
-            line, start_line_idx, end_line_idx = self.extract_line(table, embed_control_idx)
-            
-            region_name = line.split("(")[1].split(",")[0].strip()
-            
-            return region_name, end_line_idx
-        except (ValueError, IndexError) as e:
-            return None, start_idx + 1
-
-    def process_field_definition(self, table, region_name, start_idx):
-        fields = []
-        try:
-            field_pattern = f"Field ({region_name}"
-            if field_pattern not in table[start_idx:]:
-                return fields, len(table)
-                
-            field_start_idx = table.index(field_pattern, start_idx)
-            field_line, field_start_line_idx, field_end_line_idx = self.extract_line(table, field_start_idx)
-            
-            field_block = self.extract_block_content(table, field_end_line_idx)
-            
-            for line in field_block.splitlines():
-                line = line.strip()
-                if not line or line in ["{", "}"]:
-                    continue
-                    
-                field_name, field_size = self.parse_field_line(line)
-                if field_name and field_size is not None:
-                    field_info = {
-                        "name": field_name,
-                        "size": field_size,
-                    }
-                    fields.append(field_info)
-            
-            return fields, field_end_line_idx
-        except (ValueError, IndexError) as e:
-            return fields, start_idx + 1
-
     def battery_status_patch(self):
         if not self.dsdt:
             return False
 
-        search_start_idx = 0
-        all_fields = []
-        
-        while "EmbeddedControl" in self.dsdt.get("table")[search_start_idx:]:
-            region_name, search_start_idx = self.process_embedded_control_region(self.dsdt.get("table"), search_start_idx)
-            
-            if not region_name:
-                continue
-                
-            current_idx = search_start_idx
-            region_fields = []
-            
-            while True:
-                fields, next_idx = self.process_field_definition(self.dsdt.get("table"), region_name, current_idx)
-                
-                if not fields or next_idx <= current_idx:
-                    break
-                    
-                region_fields.extend(fields)
-                current_idx = next_idx
-                
-                if f"Field ({region_name}" not in self.dsdt.get("table")[current_idx:]:
-                    break
-            
-            all_fields.extend(region_fields)
-
-        return any(f["size"] > 8 for f in all_fields)
+        # ECEnabler is only needed if the EC has fields wider than a byte
+        return any(
+            field["size"] > 8
+            for region in self.acpi.get_operation_regions(space="EmbeddedControl", table=self.dsdt)
+            for field in region["fields"]
+        )
 
     def dropping_the_table(self, signature=None, oemtableid=None):
         table_data = self.acpi.get_table_with_signature(signature) or self.acpi.get_table_with_id(oemtableid)
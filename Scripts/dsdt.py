@@ -1,11 +1,151 @@
 # Original source: https://github.com/corpnewt/SSDTTime/blob/64446d553fcbc14a4e6ebf3d8d16e3357b5cbf50/Scripts/dsdt.py
 
-import os, errno, tempfile, shutil, plistlib, sys, binascii, zipfile, getpass, re
+import os, errno, tempfile, shutil, plistlib, sys, binascii, zipfile, getpass, re, bisect, json, zlib, hashlib, threading, heapq
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from Scripts import file_cache
 from Scripts import github
 from Scripts import resource_fetcher
 from Scripts import run
 from Scripts import utils
 
+# Part of every listing cache key - bump it whenever the listing parsing or
+# the cached fields change so older entries aren't served
+CACHE_VERSION = 1
+
+class LazyTable(dict):
+    # Table dict that holds only the header info until one of the listing
+    # keys is looked up - at which point the loader is called once to
+    # parse and index the table
+    listing_keys = ("table","lines","scopes","paths","hex_index","path_index","scope_index","hid_index")
+
+    def __init__(self, loader, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.loader = loader
+        self.lock = threading.Lock()
+
+    def materialize(self):
+        with self.lock:
+            if self.loader:
+                self.update(self.loader(self))
+                self.loader = None
+        return self
+
+    def __missing__(self, key):
+        if key in self.listing_keys and self.loader:
+            return dict.__getitem__(self.materialize(),key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.listing_keys and self.loader:
+            self.materialize()
+        return dict.get(self,key,default)
+
+    def __contains__(self, key):
+        if key in self.listing_keys and self.loader:
+            self.materialize()
+        return dict.__contains__(self,key)
+
+class ListingLines:
+    # List-like view of a table's lines backed by the single table text and
+    # the offset each line starts at - rather than a str object per line.
+    # Any lines assigned to are kept separately, and the text is untouched
+    def __init__(self, text):
+        self.text = text
+        self.starts = array("I",[0])
+        index = text.find("\n")
+        while index != -1:
+            self.starts.append(index+1)
+            index = text.find("\n",index+1)
+        self.overrides = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _get(self, index):
+        if index in self.overrides:
+            return self.overrides[index]
+        end = self.starts[index+1]-1 if index+1 < len(self.starts) else len(self.text)
+        return self.text[self.starts[index]:end]
+
+    def __getitem__(self, index):
+        if isinstance(index,slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return self._get(index)
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list assignment index out of range")
+        self.overrides[index] = value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def __reversed__(self):
+        for i in range(len(self)-1,-1,-1):
+            yield self._get(i)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+class ListingScopes:
+    # List-like view of the (line,index) scopes tuples that only stores
+    # the indexes, pulling the lines from the table when accessed
+    def __init__(self, lines, indexes):
+        self.lines = lines
+        self.indexes = array("I",indexes)
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index,slice):
+            return [(self.lines[i],i) for i in self.indexes[index]]
+        i = self.indexes[index]
+        return (self.lines[i],i)
+
+    def __iter__(self):
+        for i in self.indexes:
+            yield (self.lines[i],i)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+class NamespaceNode:
+    # A single element of a table's namespace.  Nodes for elements that are
+    # only ever opened with Scope () have no type or definitions
+    __slots__ = ("name","path","type","line","end","parent","children","definitions")
+
+    def __init__(self, name, path, parent=None):
+        self.name = name
+        self.path = path
+        self.type = None
+        self.line = -1
+        self.end = -1
+        self.parent = parent
+        self.children = {}
+        # (line,type) of every definition - If/Else branches can define the
+        # same object more than once
+        self.definitions = []
+
+    def get_paths(self):
+        return [(self.path,line,obj_type) for line,obj_type in self.definitions]
+
+    def walk(self):
+        # Yields this node's descendants, depth first
+        stack = list(self.children.values())[::-1]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(list(node.children.values())[::-1])
+
 class DSDT:
     def __init__(self, **kwargs):
         #self.dl = downloader.Downloader()
@@ -38,6 +178,14 @@ class DSDT:
         self.allowed_signatures = (b"APIC",b"DMAR",b"DSDT",b"SSDT")
         self.mixed_listing      = (b"DSDT",b"SSDT")
         self.acpi_tables = {}
+        # Disassembled listings are cached by table contents and iasl version
+        self.cache = file_cache.FileCache(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "Cache", "ACPI"))
+        self.iasl_version = None
+        # Query results are memoized until acpi_tables is replaced or loaded
+        # into - see memoize()
+        self.memo = {"tables":None,"results":{}}
+        self.memo_lock = threading.Lock()
+        self.memo_stats = {"hits":0,"misses":0}
         # Setup regex matches
         self.hex_match  = re.compile(r"^\s*[0-9A-F]{4,}:(\s[0-9A-F]{2})+(\s+\/\/.*)?$")
         self.type_match = re.compile(r".*(?P<type>Processor|Scope|Device|Method|Name) \((?P<name>[^,\)]+).*")
@@ -75,9 +223,13 @@ class DSDT:
                 unprintables = True
         return (unprintables,ascii_string)
 
-    def load(self, table_path):
+    def load(self, table_path, parallel=False, max_workers=None, lazy=False):
         # Attempt to load the passed file - or if a directory
-        # was passed, load all .aml and .dat files within
+        # was passed, load all .aml and .dat files within.  If
+        # parallel is True, each table is disassembled and processed
+        # in its own worker instead of in a single iasl run.  If lazy
+        # is True, the SSDTs are disassembled as usual but aren't parsed
+        # until their listings are first needed
         cwd = os.getcwd()
         temp = None
         target_files = {}
@@ -131,18 +283,39 @@ class DSDT:
             # Generate and run a command
             dsdt_or_ssdt = [x for x in list(target_files) if self._table_signature(temp,x) in self.mixed_listing]
             other_tables = [x for x in list(target_files) if not x in dsdt_or_ssdt]
+            mixed_listings = list(dsdt_or_ssdt)
             out_d = ("","",0)
             out_t = ("","",0)
+            # SSDTs are still disassembled with everything else when lazy, so
+            # their listings and failures match a full load - only parsing
+            # and indexing them waits until they're first needed
+            deferred = [x for x in mixed_listings if self._table_signature(temp,x) != b"DSDT"] if lazy else []
+            # Check the cache for listings we've already disassembled.  Mixed
+            # listings are disassembled together with -da so each can resolve
+            # the others' externals - they're keyed on the full set, and we
+            # only skip iasl for them if every one is cached
+            cache_keys = {}
+            cached = {}
+            for x in dsdt_or_ssdt+other_tables:
+                # Mixed listings from one -da run can differ from those made
+                # per table with -e, so each mode keeps its own entries
+                cache_keys[x] = self.get_listing_cache_key(
+                    os.path.join(temp,x),
+                    companions=[os.path.join(temp,y) for y in mixed_listings if y != x] if x in mixed_listings else [],
+                    mode=("e" if parallel else "da") if x in mixed_listings else None
+                )
+                listing = self.get_cached_listing(cache_keys[x])
+                if listing:
+                    cached[x] = listing
+            if all(x in cached for x in dsdt_or_ssdt):
+                dsdt_or_ssdt = []
+            else:
+                for x in dsdt_or_ssdt:
+                    cached.pop(x,None)
+            other_tables = [x for x in other_tables if not x in cached]
 
-            def exists(folder_path,file_name):
-                # Helper to make sure the file exists and has a non-Zero size
-                check_path = os.path.join(folder_path,file_name)
-                if os.path.isfile(check_path) and os.stat(check_path).st_size > 0:
-                    return True
-                return False
-            
             # Check our DSDT and SSDTs first
-            if dsdt_or_ssdt:
+            if dsdt_or_ssdt and not parallel:
                 args = [self.iasl,"-da","-dl","-l"]+list(dsdt_or_ssdt)
                 out_d = self.r.run({"args":args})
                 if out_d[2] != 0:
@@ -152,105 +325,33 @@ class DSDT:
                 # Get a list of disassembled names that failed
                 fail_temp = []
                 for x in dsdt_or_ssdt:
-                    if not exists(temp,target_files[x]["disassembled_name"]):
+                    if not self._exists(temp,target_files[x]["disassembled_name"]):
                         fail_temp.append(x)
                 # Let's try to disassemble any that failed individually
                 for x in fail_temp:
                     args = [self.iasl,"-dl","-l",x]
                     self.r.run({"args":args})
-                    if not exists(temp,target_files[x]["disassembled_name"]):
+                    if not self._exists(temp,target_files[x]["disassembled_name"]):
                         failed.append(x)
             # Check for other tables (DMAR, APIC, etc)
-            if other_tables:
+            if other_tables and not parallel:
                 args = [self.iasl]+list(other_tables)
                 out_t = self.r.run({"args":args})
                 # Get a list of disassembled names that failed
                 for x in other_tables:
-                    if not exists(temp,target_files[x]["disassembled_name"]):
+                    if not self._exists(temp,target_files[x]["disassembled_name"]):
                         failed.append(x)
+            if parallel:
+                # Disassemble and process every table in its own worker
+                to_remove = self._load_parallel(temp,target_files,dsdt_or_ssdt+other_tables,mixed_listings,cached,cache_keys,failed,deferred,max_workers=max_workers)
             if len(failed) == len(target_files):
                 raise Exception("Failed to disassemble - {}".format(", ".join(failed)))
-            # Actually process the tables now
-            to_remove = []
-            for file in target_files:
-                # We need to load the .aml and .dsl into memory
-                # and get the paths and scopes
-                if not exists(temp,target_files[file]["disassembled_name"]):
-                    to_remove.append(file)
-                    continue
-                with open(os.path.join(temp,target_files[file]["disassembled_name"]),"r") as f:
-                    target_files[file]["table"] = f.read()
-                    # Remove the compiler info at the start
-                    if target_files[file]["table"].startswith("/*"):
-                        target_files[file]["table"] = "*/".join(target_files[file]["table"].split("*/")[1:]).strip()
-                    # Check for "Table Header:" or "Raw Table Data: Length" and strip everything
-                    # after the last occurrence
-                    for h in ("\nTable Header:","\nRaw Table Data: Length"):
-                        if h in target_files[file]["table"]:
-                            target_files[file]["table"] = h.join(target_files[file]["table"].split(h)[:-1]).rstrip()
-                            break # Bail on the first match
-                    target_files[file]["lines"] = target_files[file]["table"].split("\n")
-                    target_files[file]["scopes"] = self.get_scopes(table=target_files[file])
-                    target_files[file]["paths"] = self.get_paths(table=target_files[file])
-                with open(os.path.join(temp,file),"rb") as f:
-                    table_bytes = f.read()
-                    target_files[file]["raw"] = table_bytes
-                    # Let's read the table header and get the info we need
-                    #
-                    # [0:4]   = Table Signature
-                    # [4:8]   = Length (little endian)
-                    # [8]     = Compliance Revision
-                    # [9]     = Checksum
-                    # [10:16] = OEM ID (6 chars, padded to the right with \x00)
-                    # [16:24] = Table ID (8 chars, padded to the right with \x00)
-                    # [24:28] = OEM Revision (little endian)
-                    # 
-                    target_files[file]["signature"] = table_bytes[0:4]
-                    target_files[file]["revision"]  = table_bytes[8]
-                    target_files[file]["oem"]       = table_bytes[10:16]
-                    target_files[file]["id"]        = table_bytes[16:24]
-                    target_files[file]["oem_revision"] = int(binascii.hexlify(table_bytes[24:28][::-1]),16)
-                    target_files[file]["length"]    = len(table_bytes)
-                    # Get the printable versions of the sig, oem, and id as needed
-                    for key in ("signature","oem","id"):
-                        unprintable,ascii_string = self.get_ascii_print(target_files[file][key])
-                        if unprintable:
-                            target_files[file][key+"_ascii"] = ascii_string
-                    # Cast as int on py2, and try to decode bytes to strings on py3
-                    if 2/3==0:
-                        target_files[file]["revision"] = int(binascii.hexlify(target_files[file]["revision"]),16)
-                # The disassembler omits the last line of hex data in a mixed listing
-                # file... convenient.  However - we should be able to reconstruct this
-                # manually.
-                last_hex = next((l for l in target_files[file]["lines"][::-1] if self.is_hex(l)),None)
-                if last_hex:
-                    # Get the address left of the colon
-                    addr = int(last_hex.split(":")[0].strip(),16)
-                    # Get the hex bytes right of the colon
-                    hexs = last_hex.split(":")[1].split("//")[0].strip()
-                    # Increment the address by the number of hex bytes
-                    next_addr = addr+len(hexs.split())
-                    # Now we need to get the bytes at the end
-                    hexb = self.get_hex_bytes(hexs.replace(" ",""))
-                    # Get the last occurrence after the split
-                    remaining = target_files[file]["raw"].split(hexb)[-1]
-                    # Iterate in chunks of 16
-                    for chunk in [remaining[i:i+16] for i in range(0,len(remaining),16)]:
-                        # Build a new byte string
-                        hex_string = binascii.hexlify(chunk)
-                        # Decode the bytes if we're on python 3
-                        if 2/3!=0: hex_string = hex_string.decode()
-                        # Ensure the bytes are all upper case
-                        hex_string = hex_string.upper()
-                        l = "   {}: {}".format(
-                            hex(next_addr)[2:].upper().rjust(4,"0"),
-                            " ".join([hex_string[i:i+2] for i in range(0,len(hex_string),2)])
-                        )
-                        # Increment our address
-                        next_addr += len(chunk)
-                        # Append our line
-                        target_files[file]["lines"].append(l)
-                        target_files[file]["table"] += "\n"+l
+            if not parallel:
+                # Actually process the tables now
+                to_remove = []
+                for file in target_files:
+                    if not self._process_table(temp,target_files,file,cached,cache_keys,defer=file in deferred):
+                        to_remove.append(file)
             # Remove any that didn't disassemble
             for file in to_remove:
                 target_files.pop(file,None)
@@ -263,9 +364,258 @@ class DSDT:
         # Add/update any tables we loaded
         for table in target_files:
             self.acpi_tables[table] = target_files[table]
+        if target_files:
+            self.clear_memo()
         # Only return the newly loaded results
         return (target_files, failed,)
 
+    def _exists(self, folder_path, file_name):
+        # Helper to make sure the file exists and has a non-Zero size
+        check_path = os.path.join(folder_path,file_name)
+        if os.path.isfile(check_path) and os.stat(check_path).st_size > 0:
+            return True
+        return False
+
+    def probe_table(self, table_path):
+        # Checks that iasl can disassemble the table by itself - without a
+        # listing, and without parsing the result - as a quick test before
+        # committing to a full load()
+        temp = tempfile.mkdtemp()
+        try:
+            name = os.path.basename(table_path)
+            shutil.copy(table_path,os.path.join(temp,name))
+            self.r.run({"args":[self.iasl,os.path.join(temp,name)]})
+            return self._exists(temp,os.path.splitext(name)[0]+".dsl")
+        except Exception:
+            return False
+        finally:
+            shutil.rmtree(temp,ignore_errors=True)
+
+    def _process_table(self, temp, target_files, file, cached, cache_keys, defer=False):
+        # We need to load the .aml and .dsl into memory
+        # and get the paths and scopes
+        if file in cached:
+            # Restore the listing we saved last time
+            listing = cached[file]
+        elif not self._exists(temp,target_files[file]["disassembled_name"]):
+            return False
+        else:
+            listing = self._read_listing(os.path.join(temp,target_files[file]["disassembled_name"]))
+        self._read_table_header(temp,target_files,file)
+        if defer:
+            # Hold onto the listing and parse it the first time it's needed
+            target_files[file] = LazyTable(
+                lambda table,listing=listing,cache_key=cache_keys[file]: self._index_table(table,listing,cache_key),
+                target_files[file]
+            )
+        else:
+            target_files[file].update(self._index_table(target_files[file],listing,cache_keys[file]))
+        return True
+
+    def _read_listing(self, dsl_path):
+        with open(dsl_path,"r") as f:
+            table = f.read()
+        # Remove the compiler info at the start
+        if table.startswith("/*"):
+            table = "*/".join(table.split("*/")[1:]).strip()
+        # Check for "Table Header:" or "Raw Table Data: Length" and strip everything
+        # after the last occurrence
+        for h in ("\nTable Header:","\nRaw Table Data: Length"):
+            if h in table:
+                table = h.join(table.split(h)[:-1]).rstrip()
+                break # Bail on the first match
+        return table
+
+    def _index_table(self, table, listing, cache_key):
+        # Returns the listing keys for the table - either restored from a
+        # cached listing dict, or parsed from the listing text and cached
+        table = dict(table)
+        cached = isinstance(listing,dict)
+        if cached:
+            table["table"] = listing["table"]
+            table["paths"] = listing["paths"]
+        else:
+            table["table"] = listing
+            table["lines"] = listing.split("\n")
+        # The disassembler omits the last line of hex data in a mixed listing
+        # file... convenient.  However - we should be able to reconstruct this
+        # manually.
+        last_hex = None if cached else next((l for l in table["lines"][::-1] if self.is_hex(l)),None)
+        if last_hex:
+            # Get the address left of the colon
+            addr = int(last_hex.split(":")[0].strip(),16)
+            # Get the hex bytes right of the colon
+            hexs = last_hex.split(":")[1].split("//")[0].strip()
+            # Increment the address by the number of hex bytes
+            next_addr = addr+len(hexs.split())
+            # Now we need to get the bytes at the end
+            hexb = self.get_hex_bytes(hexs.replace(" ",""))
+            # Get the last occurrence after the split
+            remaining = table["raw"].split(hexb)[-1]
+            # Iterate in chunks of 16
+            for chunk in [remaining[i:i+16] for i in range(0,len(remaining),16)]:
+                # Build a new byte string
+                hex_string = binascii.hexlify(chunk)
+                # Decode the bytes if we're on python 3
+                if 2/3!=0: hex_string = hex_string.decode()
+                # Ensure the bytes are all upper case
+                hex_string = hex_string.upper()
+                l = "   {}: {}".format(
+                    hex(next_addr)[2:].upper().rjust(4,"0"),
+                    " ".join([hex_string[i:i+2] for i in range(0,len(hex_string),2)])
+                )
+                # Increment our address
+                next_addr += len(chunk)
+                # Append our line
+                table["lines"].append(l)
+                table["table"] += "\n"+l
+        # Index the hex lines once so the walkers below don't need to
+        # regex every line on each pass
+        # Swap the lines list for a view over the table text so we aren't
+        # holding onto both
+        table["lines"] = ListingLines(table["table"])
+        table["hex_index"] = self.build_hex_index(table=table)
+        if cached:
+            table["scopes"] = ListingScopes(table["lines"],listing["scopes"])
+        else:
+            table["scopes"] = ListingScopes(
+                table["lines"],
+                [x[1] for x in self.get_scopes(table=table)]
+            )
+            table["paths"],table["scope_index"] = self._walk_paths(table)
+            self.set_cached_listing(cache_key,table)
+        table["path_index"] = self.build_path_index(table=table)
+        table["hid_index"] = self.build_hid_index(table=table)
+        return dict((x,table[x]) for x in LazyTable.listing_keys if x in table)
+
+    def _read_table_header(self, temp, target_files, file):
+        with open(os.path.join(temp,file),"rb") as f:
+            table_bytes = f.read()
+            target_files[file]["raw"] = table_bytes
+            # Let's read the table header and get the info we need
+            #
+            # [0:4]   = Table Signature
+            # [4:8]   = Length (little endian)
+            # [8]     = Compliance Revision
+            # [9]     = Checksum
+            # [10:16] = OEM ID (6 chars, padded to the right with \x00)
+            # [16:24] = Table ID (8 chars, padded to the right with \x00)
+            # [24:28] = OEM Revision (little endian)
+            # 
+            target_files[file]["signature"] = table_bytes[0:4]
+            target_files[file]["revision"]  = table_bytes[8]
+            target_files[file]["oem"]       = table_bytes[10:16]
+            target_files[file]["id"]        = table_bytes[16:24]
+            target_files[file]["oem_revision"] = int(binascii.hexlify(table_bytes[24:28][::-1]),16)
+            target_files[file]["length"]    = len(table_bytes)
+            # Get the printable versions of the sig, oem, and id as needed
+            for key in ("signature","oem","id"):
+                unprintable,ascii_string = self.get_ascii_print(target_files[file][key])
+                if unprintable:
+                    target_files[file][key+"_ascii"] = ascii_string
+            # Cast as int on py2, and try to decode bytes to strings on py3
+            if 2/3==0:
+                target_files[file]["revision"] = int(binascii.hexlify(target_files[file]["revision"]),16)
+
+    def _disassemble_table(self, temp, target_files, file, companions=None):
+        # Mixed listings get the other DSDT/SSDTs passed with -e so their
+        # externals resolve like they would in a single -da run - falling
+        # back on disassembling the table by itself if that fails
+        table_path = os.path.join(temp,file)
+        if companions is None:
+            attempts = [[self.iasl,table_path]]
+        else:
+            attempts = [[self.iasl,"-dl","-l",table_path]]
+            if companions:
+                attempts.insert(0,[self.iasl,"-dl","-l","-e"]+[os.path.join(temp,x) for x in companions]+["-d",table_path])
+        for args in attempts:
+            self.r.run({"args":args})
+            if self._exists(temp,target_files[file]["disassembled_name"]):
+                return True
+        return False
+
+    def _load_parallel(self, temp, target_files, to_disassemble, mixed_listings, cached, cache_keys, failed, deferred, max_workers=None):
+        def worker(file):
+            # Returns a tuple of whether the table processed, and whether
+            # iasl failed to disassemble it
+            if file in to_disassemble:
+                companions = [x for x in mixed_listings if x != file] if file in mixed_listings else None
+                if not self._disassemble_table(temp,target_files,file,companions=companions):
+                    return (False,True)
+            return (self._process_table(temp,target_files,file,cached,cache_keys,defer=file in deferred),False)
+        files = list(target_files)
+        with ThreadPoolExecutor(max_workers=max_workers or min(8,os.cpu_count() or 1)) as executor:
+            results = dict(zip(files,executor.map(worker,files)))
+        # Keep the same order the single iasl run would report failures in
+        failed.extend([x for x in to_disassemble if results[x][1]])
+        return [x for x in files if not results[x][0]]
+
+    def materialize_tables(self):
+        # Parses every table still deferred by load(lazy=True), for callers
+        # about to walk all of them
+        for table in list(self.acpi_tables.values()):
+            if isinstance(table,LazyTable):
+                table.materialize()
+
+    def get_iasl_version(self):
+        if self.iasl_version is None:
+            # Different iasl builds can disassemble the same table differently,
+            # so the version is part of every listing cache key
+            out = self.r.run({"args":[self.iasl,"-v"]})
+            self.iasl_version = out[0].strip()
+            if not self.iasl_version:
+                # Fall back on the binary itself if it won't report a version
+                try:
+                    stat = os.stat(self.iasl)
+                    self.iasl_version = "{}|{}|{}".format(self.iasl,stat.st_size,stat.st_mtime)
+                except:
+                    self.iasl_version = str(self.iasl)
+        return self.iasl_version
+
+    def get_listing_cache_key(self, table_path, companions=[], mode=None):
+        def digest(path):
+            with open(path,"rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        return self._get_listing_cache_key(digest(table_path),[digest(x) for x in companions],mode)
+
+    def _get_listing_cache_key(self, digest, companion_digests, mode=None):
+        # mode is how the table was disassembled - "da" for a single run over
+        # every mixed listing, "e" for one table with the rest as externals
+        return self.cache.get_key(
+            CACHE_VERSION,
+            self.get_iasl_version(),
+            mode,
+            digest,
+            *sorted(companion_digests)
+        )
+
+    def get_cached_listing(self, key):
+        data = self.cache.get(key)
+        if not data:
+            return None
+        try:
+            listing = json.loads(zlib.decompress(data).decode("utf-8"))
+            # The scopes stay as line indexes - _index_table builds the lines
+            # view they share with the table
+            return {
+                "table": listing["table"],
+                "scopes": listing["scopes"],
+                "paths": [tuple(x) for x in listing["paths"]]
+            }
+        except Exception:
+            # Corrupt or outdated entry - drop it and disassemble again
+            self.cache.remove(key)
+            return None
+
+    def set_cached_listing(self, key, table):
+        # Scopes are stored as line indexes only - the lines come from the table
+        listing = {
+            "table": table["table"],
+            "scopes": [x[1] for x in table.get("scopes",[])],
+            "paths": table.get("paths",[])
+        }
+        return self.cache.set(key, zlib.compress(json.dumps(listing).encode("utf-8")))
+
     def get_latest_iasl(self):
         latest_release = self.github.get_latest_release("acpica", "acpica") or {}
 
@@ -439,6 +789,37 @@ class DSDT:
     def get_hex_bytes(self, line):
         return binascii.unhexlify(line)
 
+    def clear_memo(self):
+        with self.memo_lock:
+            self.memo = {"tables":self.acpi_tables,"results":{}}
+
+    def memoize(self, key, function, table=None):
+        # Returns the saved result for the key, or calls function to get it.
+        # The memo holds onto the acpi_tables dict it was built against and
+        # starts over once that's been replaced.  If a table is passed, the
+        # result is only reused for that same table object
+        with self.memo_lock:
+            if self.memo["tables"] is not self.acpi_tables:
+                self.memo = {"tables":self.acpi_tables,"results":{}}
+            results = self.memo["results"]
+            if key in results and results[key][0] is table:
+                self.memo_stats["hits"] += 1
+                return results[key][1]
+            self.memo_stats["misses"] += 1
+        result = function()
+        with self.memo_lock:
+            if self.memo["results"] is results:
+                results[key] = (table,result)
+        return result
+
+    def get_memo_stats(self):
+        with self.memo_lock:
+            return {
+                "hits": self.memo_stats["hits"],
+                "misses": self.memo_stats["misses"],
+                "entries": len(self.memo["results"])
+            }
+
     def get_str_bytes(self, value):
         if 2/3!=0 and isinstance(value,str):
             value = value.encode()
@@ -467,45 +848,144 @@ class DSDT:
             return None
         return list(self.acpi_tables.values())[0]
 
+    def build_hex_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Walks the lines once and records which are hex, the address each
+        # hex line starts at, and the (start,end) line indexes of each run of
+        # consecutive hex lines
+        lines = table.get("lines",[])
+        hex_lines = bytearray(len(lines))
+        addresses = array("i",[-1])*len(lines)
+        # Parallel lists of hex line indexes, their addresses, and their byte
+        # counts - used to map between lines and offsets in the raw table
+        line_indexes = array("i")
+        line_addresses = array("i")
+        line_sizes = array("i")
+        run_starts = array("i")
+        run_ends = array("i")
+        for i,line in enumerate(lines):
+            if not self.is_hex(line):
+                continue
+            hex_lines[i] = 1
+            try:
+                address,hex_bytes = line.split("//")[0].split(":")[:2]
+                addresses[i] = int(address.strip(),16)
+                line_indexes.append(i)
+                line_addresses.append(addresses[i])
+                line_sizes.append(len(hex_bytes.split()))
+            except: pass
+            if run_ends and run_ends[-1] == i-1:
+                run_ends[-1] = i
+            else:
+                run_starts.append(i)
+                run_ends.append(i)
+        return {
+            "lines": hex_lines,
+            "addresses": addresses,
+            "line_indexes": line_indexes,
+            "line_addresses": line_addresses,
+            "line_sizes": line_sizes,
+            "run_starts": run_starts,
+            "run_ends": run_ends
+        }
+
+    def get_hex_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Build the index if it's missing or the lines changed length since
+        hex_index = table.get("hex_index")
+        if not hex_index or len(hex_index["lines"]) != len(table.get("lines",[])):
+            hex_index = table["hex_index"] = self.build_hex_index(table=table)
+        return hex_index
+
+    def is_hex_at(self, index, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return False
+        hex_lines = self.get_hex_index(table=table)["lines"]
+        return 0 <= index < len(hex_lines) and hex_lines[index] == 1
+
+    def _get_hex_run(self, index, table):
+        # Returns the position in the runs list of the run containing index,
+        # or of the last run that starts before it
+        hex_index = self.get_hex_index(table=table)
+        return bisect.bisect_right(hex_index["run_starts"],index)-1
+
+    def _get_hex_between(self, start_index, end_index, table):
+        lines = table.get("lines",[])
+        return "".join([self.get_hex(lines[i]) for i in range(start_index,end_index+1)])
+
+    def get_next_hex_index(self, index=0, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return -1
+        # Returns the line index find_next_hex() would, without building the hex
+        if index < 0: return -1
+        hex_index = self.get_hex_index(table=table)
+        r = self._get_hex_run(index,table)+1
+        return hex_index["run_starts"][r] if r < len(hex_index["run_starts"]) else -1
+
+    def get_offset_for_line(self, index, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return -1
+        # Returns the byte offset in the raw table of the passed line - or of
+        # the first hex line following it if it's an ASL line, as that's
+        # where the disassembler emits the bytes for it
+        if index < 0: return -1
+        hex_index = self.get_hex_index(table=table)
+        i = bisect.bisect_left(hex_index["line_indexes"],index)
+        return hex_index["line_addresses"][i] if i < len(hex_index["line_indexes"]) else -1
+
+    def get_line_for_offset(self, offset, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return -1
+        # Returns the index of the hex line holding the passed byte offset
+        hex_index = self.get_hex_index(table=table)
+        i = bisect.bisect_right(hex_index["line_addresses"],offset)-1
+        if i < 0 or offset >= hex_index["line_addresses"][i]+hex_index["line_sizes"][i]:
+            return -1
+        return hex_index["line_indexes"][i]
+
+    def get_raw_for_lines(self, start_index, end_index, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return b""
+        # Returns the raw bytes covered by the hex lines between the passed
+        # line indexes (inclusive)
+        hex_index = self.get_hex_index(table=table)
+        start = bisect.bisect_left(hex_index["line_indexes"],max(start_index,0))
+        end = bisect.bisect_right(hex_index["line_indexes"],end_index)-1
+        if start > end:
+            return b""
+        return table.get("raw",b"")[
+            hex_index["line_addresses"][start]:hex_index["line_addresses"][end]+hex_index["line_sizes"][end]
+        ]
+
     def find_previous_hex(self, index=0, table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return ("",-1,-1)
         # Returns the index of the previous set of hex digits before the passed index
-        start_index = -1
-        end_index   = -1
-        old_hex = True
-        for i,line in enumerate(table.get("lines","")[index::-1]):
-            if old_hex:
-                if not self.is_hex(line):
-                    # Broke out of the old hex
-                    old_hex = False
-                continue
-            # Not old_hex territory - check if we got new hex
-            if self.is_hex(line): # Checks for a :, but not in comments
-                end_index = index-i
-                hex_text,start_index = self.get_hex_ending_at(end_index,table=table)
-                return (hex_text, start_index, end_index)
-        return ("",start_index,end_index)
+        if index < 0: return ("",-1,-1)
+        index = min(index,len(table.get("lines",[]))-1)
+        hex_index = self.get_hex_index(table=table)
+        r = self._get_hex_run(index,table)
+        if r >= 0 and hex_index["run_ends"][r] >= index:
+            # We're in the middle of a run - skip it
+            r -= 1
+        if r < 0:
+            return ("",-1,-1)
+        start_index,end_index = hex_index["run_starts"][r],hex_index["run_ends"][r]
+        return (self._get_hex_between(start_index,end_index,table), start_index, end_index)
     
     def find_next_hex(self, index=0, table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return ("",-1,-1)
         # Returns the index of the next set of hex digits after the passed index
-        start_index = -1
-        end_index   = -1
-        old_hex = True
-        for i,line in enumerate(table.get("lines","")[index:]):
-            if old_hex:
-                if not self.is_hex(line):
-                    # Broke out of the old hex
-                    old_hex = False
-                continue
-            # Not old_hex territory - check if we got new hex
-            if self.is_hex(line): # Checks for a :, but not in comments
-                start_index = i+index
-                hex_text,end_index = self.get_hex_starting_at(start_index,table=table)
-                return (hex_text, start_index, end_index)
-        return ("",start_index,end_index)
+        if index < 0: return ("",-1,-1)
+        hex_index = self.get_hex_index(table=table)
+        r = self._get_hex_run(index,table)+1
+        if r >= len(hex_index["run_starts"]):
+            return ("",-1,-1)
+        start_index,end_index = hex_index["run_starts"][r],hex_index["run_ends"][r]
+        return (self._get_hex_between(start_index,end_index,table), start_index, end_index)
 
     def is_hex(self, line):
         return self.hex_match.match(line) is not None
@@ -514,27 +994,51 @@ class DSDT:
         if not table: table = self.get_dsdt_or_only()
         if not table: return ("",-1)
         # Returns a tuple of the hex, and the ending index
-        hex_text = ""
-        index = -1
-        for i,x in enumerate(table.get("lines","")[start_index:]):
-            if not self.is_hex(x):
-                break
-            hex_text += self.get_hex(x)
-            index = i+start_index
-        return (hex_text, index)
+        if not self.is_hex_at(start_index,table=table):
+            return ("",-1)
+        index = self.get_hex_index(table=table)["run_ends"][self._get_hex_run(start_index,table)]
+        return (self._get_hex_between(start_index,index,table), index)
 
     def get_hex_ending_at(self, start_index, table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return ("",-1)
         # Returns a tuple of the hex, and the ending index
-        hex_text = ""
-        index = -1
-        for i,x in enumerate(table.get("lines","")[start_index::-1]):
-            if not self.is_hex(x):
-                break
-            hex_text = self.get_hex(x)+hex_text
-            index = start_index-i
-        return (hex_text, index)
+        if not self.is_hex_at(start_index,table=table):
+            return ("",-1)
+        index = self.get_hex_index(table=table)["run_starts"][self._get_hex_run(start_index,table)]
+        return (self._get_hex_between(index,start_index,table), index)
+
+    def find_signatures(self, signatures, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return {}
+        # Returns a dict of each passed hex signature and the offsets it's
+        # found at in the table's raw bytes.  Any not scanned for yet are
+        # matched together in a single pass - the regex lists the possible
+        # starts, and each start is then checked against all of them.  The
+        # offsets are kept with the table until its raw bytes change
+        raw = table.get("raw",b"")
+        signatures = [x.upper() for x in signatures]
+        signature_index = table.get("signature_index")
+        if not signature_index or signature_index["raw"] is not raw:
+            signature_index = table["signature_index"] = {"raw":raw,"offsets":{}}
+        offsets = signature_index["offsets"]
+        missing = [x for x in set(signatures) if not x in offsets]
+        if missing:
+            found = dict((x,[]) for x in missing)
+            patterns = dict((x,binascii.unhexlify(x)) for x in missing)
+            matcher = re.compile(b"(?=" + b"|".join(
+                re.escape(x) for x in sorted(set(patterns.values()),key=len,reverse=True)
+            ) + b")",re.DOTALL)
+            for match in matcher.finditer(raw):
+                start = match.start()
+                for signature,pattern in patterns.items():
+                    if raw.startswith(pattern,start):
+                        found[signature].append(start)
+            offsets.update(found)
+        return dict((x,offsets[x]) for x in signatures)
+
+    def get_signature_offsets(self, signature, table=None):
+        return self.find_signatures([signature],table=table).get(signature.upper(),[])
 
     def get_shortest_unique_pad(self, current_hex, index, instance=0, table=None):
         if not table: table = self.get_dsdt_or_only()
@@ -583,10 +1087,12 @@ class DSDT:
         linel = current_hex.join(parts[0:instance+1])
         liner = current_hex.join(parts[instance+1:])
         last_check = True # Default to forward
+        occurrences = None
         while True:
             # Check if our hex string is unique
             check_bytes = self.get_hex_bytes(padl+current_hex+padr)
-            if table["raw"].count(check_bytes) == 1: # Got it!
+            occurrences = self.get_occurrences(table["raw"],check_bytes,occurrences)
+            if self.count_occurrences(occurrences[1],len(check_bytes)) == 1: # Got it!
                 break
             if direction == True or (direction is None and len(padr)<=len(padl)):
                 # Let's check a forward byte
@@ -609,6 +1115,36 @@ class DSDT:
             break
         return (padl,padr)
     
+    def get_occurrences(self, raw, check_bytes, prior=None):
+        # Returns a tuple of the check_bytes and every offset they're found at
+        # in raw - overlapping matches included.  If prior holds the results
+        # for a pattern that check_bytes just extends by a few bytes on either
+        # side, only the prior offsets are checked instead of rescanning raw
+        if prior and prior[0]:
+            prior_bytes,offsets = prior
+            if check_bytes.startswith(prior_bytes):
+                return (check_bytes,[x for x in offsets if raw.startswith(check_bytes,x)])
+            if check_bytes.endswith(prior_bytes):
+                pad = len(check_bytes)-len(prior_bytes)
+                return (check_bytes,[x-pad for x in offsets if x >= pad and raw.startswith(check_bytes,x-pad)])
+        offsets = []
+        index = raw.find(check_bytes)
+        while index != -1:
+            offsets.append(index)
+            index = raw.find(check_bytes,index+1)
+        return (check_bytes,offsets)
+
+    def count_occurrences(self, offsets, length):
+        # Counts the same way bytes.count() does - skipping any matches that
+        # overlap the last one counted
+        count = 0
+        next_offset = 0
+        for offset in offsets:
+            if offset >= next_offset:
+                count += 1
+                next_offset = offset+max(length,1)
+        return count
+
     def get_devices(self,search=None,types=("Device (","Scope ("),strip_comments=False,table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return []
@@ -618,8 +1154,9 @@ class DSDT:
         last_device = None
         device_index = 0
         devices = []
+        hex_lines = self.get_hex_index(table=table)["lines"]
         for index,line in enumerate(table.get("lines","")):
-            if self.is_hex(line):
+            if hex_lines[index]:
                 continue
             line = self.get_line(line) if strip_comments else line
             if any ((x for x in types if x in line)):
@@ -634,33 +1171,196 @@ class DSDT:
     def get_scope(self,starting_index=0,add_hex=False,strip_comments=False,table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return []
-        # Walks the scope starting at starting_index, and returns when
-        # we've exited
-        brackets = None
+        # Returns the lines of the scope starting at starting_index, using the
+        # scope ends precomputed by get_paths() to know where we've exited
+        lines = table.get("lines","")
+        hex_lines = self.get_hex_index(table=table)["lines"]
+        scope_index = self.get_scope_index(table=table)
+        ends = scope_index["ends" if strip_comments else "comment_ends"]
+        starting_index = max(starting_index,0)
+        end_index = len(lines)-1
+        # The scope opens on the first non-hex line with a bracket
+        for index in range(starting_index,len(lines)):
+            if hex_lines[index]: continue
+            line = self.get_line(lines[index]) if strip_comments else lines[index]
+            if "{" in line:
+                if ends[index] != -1: end_index = ends[index]
+                break
         scope = []
-        for line in table.get("lines","")[starting_index:]:
-            if self.is_hex(line):
+        for index in range(starting_index,end_index+1):
+            line = lines[index]
+            if hex_lines[index]:
                 if add_hex:
                     scope.append(line)
                 continue
-            line = self.get_line(line) if strip_comments else line
-            scope.append(line)
-            if brackets is None:
-                if line.count("{"):
-                    brackets = line.count("{")
-                continue
-            brackets = brackets + line.count("{") - line.count("}")
-            if brackets <= 0:
-                # We've exited the scope
-                return scope
+            scope.append(self.get_line(line) if strip_comments else line)
         return scope
 
+    def get_scope_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Build the index if it's missing or the lines changed length since
+        scope_index = table.get("scope_index")
+        if not scope_index or len(scope_index["ends"]) != len(table.get("lines",[])):
+            scope_index = table["scope_index"] = self._walk_paths(table)[1]
+        return scope_index
+
+    def get_power_resource_blocks(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return []
+        # Returns a list of (start,end) line indexes for each PowerResource
+        return self.get_scope_index(table=table)["power_resources"]
+
+    def get_irq_mask(self, irqs):
+        # Returns the IRQNoFlags bitmask for a comma separated list of IRQs,
+        # skipping empty and out of range values
+        mask = 0
+        for irq in irqs.split(","):
+            try: irq = int(irq)
+            except: continue
+            if 0 <= irq <= 15:
+                mask |= 1 << irq
+        return mask
+
+    def build_irq_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Walks the listing once, keeping track of the current device and
+        # saving its IRQNoFlags descriptors.  Descriptors on consecutive
+        # lines share a group - they're back to back in the AML as well, and
+        # start at the first hex line following them
+        devices = {}
+        current_device = None
+        current_hid = None
+        irq = False
+        last_irq = False
+        lines = table.get("lines",[])
+        hex_lines = self.get_hex_index(table=table)["lines"]
+        for index,line in enumerate(lines):
+            if hex_lines[index]:
+                continue
+            if irq:
+                num = line.split("{")[1].split("}")[0].replace(" ","")
+                num = "#" if not len(num) else num
+                mask = self.get_irq_mask(num)
+                if current_device in devices and last_irq:
+                    group = devices[current_device]["groups"][-1]
+                else:
+                    hex_index = self.get_next_hex_index(index,table=table)
+                    group = {"index":hex_index,"irqs":[],"masks":[]}
+                    devices.setdefault(current_device,{"groups":[]})["groups"].append(group)
+                group["irqs"].append(num)
+                group["masks"].append(mask)
+                irq = False
+                last_irq = True
+            elif "Device (" in line:
+                if current_device and current_device in devices and current_hid:
+                    devices[current_device]["hid"] = current_hid
+                last_irq = False
+                current_hid = None
+                try: current_device = line.split("(")[1].split(")")[0]
+                except:
+                    current_device = None
+                    continue
+            elif "_HID, " in line and current_device:
+                try: current_hid = line.split('"')[1]
+                except: pass
+            elif "IRQNoFlags" in line and current_device:
+                # Next line has our interrupts
+                irq = True
+            elif len(line.replace("{","").replace("}","").replace("(","").replace(")","").replace(" ","").split("//")[0]):
+                # Not a filler line - the next IRQs aren't in a row
+                last_irq = False
+        if current_device and current_device in devices and current_hid:
+            devices[current_device]["hid"] = current_hid
+        return {"lines":len(lines),"devices":devices}
+
+    def get_irq_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        irq_index = table.get("irq_index")
+        if not irq_index or irq_index["lines"] != len(table.get("lines",[])):
+            irq_index = table["irq_index"] = self.build_irq_index(table=table)
+        return irq_index
+
+    def get_irq_resources(self, table=None):
+        # Returns a dict of device names, each with a list of IRQNoFlags
+        # groups - their hex line index, and the IRQs and bitmask of each
+        # descriptor - plus the device's _HID if found
+        irq_index = self.get_irq_index(table=table)
+        return irq_index["devices"] if irq_index else {}
+
+    def build_region_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Walks the listing once, saving every OperationRegion along with
+        # the named entries of each Field and BankField declared against it.
+        # Region names aren't unique across scopes, so fields go to the last
+        # region seen with that name, and are skipped if none came before
+        regions = []
+        last_regions = {}
+        region_re = re.compile(r"^(OperationRegion|Field|BankField) \((\w+),\s*([^,)]*)")
+        field = None
+        depth = 0
+        lines = table.get("lines",[])
+        hex_lines = self.get_hex_index(table=table)["lines"]
+        for index,line in enumerate(lines):
+            if hex_lines[index]:
+                continue
+            code = line.split("//")[0].strip()
+            if field is not None:
+                if not depth:
+                    # Waiting on the opening bracket of the field list
+                    if not code.startswith("{"):
+                        field = None
+                        continue
+                    depth = code.count("{")-code.count("}")
+                    if depth <= 0:
+                        field,depth = None,0
+                    continue
+                depth += code.count("{")-code.count("}")
+                if depth <= 0:
+                    field,depth = None,0
+                    continue
+                parts = code.split(",")
+                if depth == 1 and len(parts) >= 2 and parts[0].strip():
+                    try: size = int(parts[1].strip())
+                    except ValueError: continue
+                    field.append({"name":parts[0].strip(),"size":size,"line":index})
+                continue
+            match = region_re.match(code)
+            if not match:
+                continue
+            name = match.group(2)
+            if match.group(1) == "OperationRegion":
+                last_regions[name] = {"name":name,"space":match.group(3).strip(),"line":index,"fields":[]}
+                regions.append(last_regions[name])
+            elif name in last_regions:
+                field = last_regions[name]["fields"]
+        return {"lines":len(lines),"regions":regions}
+
+    def get_region_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        region_index = table.get("region_index")
+        if not region_index or region_index["lines"] != len(table.get("lines",[])):
+            region_index = table["region_index"] = self.build_region_index(table=table)
+        return region_index
+
+    def get_operation_regions(self, space=None, table=None):
+        # Returns a list of OperationRegions - optionally only those in the
+        # passed address space - each with the fields declared against it
+        region_index = self.get_region_index(table=table)
+        if not region_index: return []
+        return [region for region in region_index["regions"] if space is None or region["space"] == space]
+
     def get_scopes(self, table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return []
         scopes = []
+        hex_lines = self.get_hex_index(table=table)["lines"]
         for index,line in enumerate(table.get("lines","")):
-            if self.is_hex(line): continue
+            if hex_lines[index]: continue
             if any(x in line for x in ("Processor (","Scope (","Device (","Method (","Name (")):
                 scopes.append((line,index))
         return scopes
@@ -668,17 +1368,50 @@ class DSDT:
     def get_paths(self, table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return []
+        return self._walk_paths(table)[0]
+
+    def _close_scopes(self, pending, brackets, index, ends):
+        # Pending scopes are kept in a heap by the bracket depth that closes
+        # them - pop any we've dropped to and save this line as their end
+        while pending and -pending[0][0] >= brackets:
+            ends[heapq.heappop(pending)[1]] = index
+
+    def _walk_paths(self, table):
+        # Returns a tuple of the paths list and the scope index.  The scope
+        # index maps each line that opens a bracket to the line get_scope()
+        # would stop at - both with and without comments stripped - and
+        # holds the (start,end) of each PowerResource block
+        lines = table.get("lines",[])
+        ends = array("i",[-1])*len(lines)
+        comment_ends = array("i",[-1])*len(lines)
+        pending = []
+        comment_pending = []
+        comment_brackets = 0
+        power_resources = []
         # Set up lists for complete paths, as well
         # as our current path reference
         path_list  = []
         _path      = []
         brackets = 0
-        for i,line in enumerate(table.get("lines",[])):
-            if self.is_hex(line):
+        hex_lines = self.get_hex_index(table=table)["lines"]
+        for i,line in enumerate(lines):
+            if hex_lines[i]:
                 # Skip hex
                 continue
+            opens = line.count("{")
+            comment_brackets += opens-line.count("}")
+            self._close_scopes(comment_pending,comment_brackets,i,comment_ends)
+            if opens:
+                # get_scope() only counts the opening line's { brackets
+                heapq.heappush(comment_pending,(-(comment_brackets-opens),i))
+            if line.strip().startswith("PowerResource"):
+                power_resources.append(i)
             line = self.get_line(line)
-            brackets += line.count("{")-line.count("}")
+            opens = line.count("{")
+            brackets += opens-line.count("}")
+            self._close_scopes(pending,brackets,i,ends)
+            if opens:
+                heapq.heappush(pending,(-(brackets-opens),i))
             while len(_path):
                 # Remove any path entries that are nested
                 # equal to or further than our current set
@@ -719,24 +1452,171 @@ class DSDT:
                 padded_path = [("\\" if j==0 else"")+x.lstrip("\\").rstrip("_") for j,x in enumerate(path)]
                 path_str = ".".join(padded_path)
                 path_list.append((path_str,i,type_match.group("type")))
-        return sorted(path_list)
+        scope_index = {
+            "ends": ends,
+            "comment_ends": comment_ends,
+            "power_resources": []
+        }
+        for i in power_resources:
+            # Each block runs through the end of the scope it opens
+            end = len(lines)-1
+            for j in range(i,len(lines)):
+                if not hex_lines[j] and "{" in lines[j]:
+                    if comment_ends[j] != -1: end = comment_ends[j]
+                    break
+            scope_index["power_resources"].append((i,end))
+        return (sorted(path_list),scope_index)
+
+    def normalize_path(self, path):
+        # Remove trailing underscores and normalize case for all path
+        # elements passed
+        return ".".join([x.rstrip("_").upper() for x in path.split(".")])
+
+    def build_path_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Files each path's position by type and by its normalized last
+        # element, and maps every trailing substring of those elements back
+        # to them - which is enough to answer the endswith() checks in
+        # get_path_of_type without scanning
+        paths = table.get("paths",[])
+        by_type = {}
+        by_name = {}
+        by_suffix = {}
+        for i,path in enumerate(paths):
+            by_type.setdefault(path[2].lower(),array("i")).append(i)
+            name = self.normalize_path(path[0].split(".")[-1])
+            if not name in by_name:
+                by_name[name] = array("i")
+                for j in range(len(name)):
+                    by_suffix.setdefault(name[j:],[]).append(name)
+            by_name[name].append(i)
+        return {
+            "paths": paths,
+            "by_type": by_type,
+            "by_name": by_name,
+            "by_suffix": by_suffix
+        }
+
+    def get_path_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Build the index if it's missing or the paths were replaced since
+        path_index = table.get("path_index")
+        if not path_index or path_index["paths"] is not table.get("paths",[]):
+            path_index = table["path_index"] = self.build_path_index(table=table)
+        return path_index
 
     def get_path_of_type(self, obj_type="Device", obj="HPET", table=None):
         if not table: table = self.get_dsdt_or_only()
         if not table: return []
-        paths = []
-        # Remove trailing underscores and normalize case for all path
-        # elements passed
-        obj = ".".join([x.rstrip("_").upper() for x in obj.split(".")])
+        return list(self.memoize(
+            (id(table),"path_of_type",obj_type,obj),
+            lambda: self._get_path_of_type(obj_type,obj,table),
+            table=table
+        ))
+
+    def _get_path_of_type(self, obj_type, obj, table):
+        path_index = self.get_path_index(table=table)
+        paths = path_index["paths"]
+        obj = self.normalize_path(obj)
         obj_type = obj_type.lower() if obj_type else obj_type
-        for path in table.get("paths",[]):
-            path_check = ".".join([x.rstrip("_").upper() for x in path[0].split(".")])
-            if (obj_type and obj_type != path[2].lower()) or not path_check.endswith(obj):
-                # Type or object mismatch - skip
-                continue
-            paths.append(path)
+        elements = obj.split(".")
+        if not obj:
+            # Everything matches - only filter on type
+            indexes = path_index["by_type"].get(obj_type,[]) if obj_type else range(len(paths))
+        elif len(elements) == 1:
+            # Only need to check the last element of each path
+            indexes = [i for name in path_index["by_suffix"].get(obj,[]) for i in path_index["by_name"][name]]
+        else:
+            # The trailing elements have to match exactly, and the element
+            # before them only has to end with the first one passed
+            count = len(elements)
+            indexes = []
+            for i in path_index["by_name"].get(elements[-1],[]):
+                path_elements = self.normalize_path(paths[i][0]).split(".")
+                if len(path_elements) >= count and path_elements[-count+1:] == elements[1:] \
+                and path_elements[-count].endswith(elements[0]):
+                    indexes.append(i)
+        paths = [paths[i] for i in indexes]
+        if obj_type:
+            paths = [path for path in paths if path[2].lower() == obj_type]
         return sorted(paths)
 
+    def build_namespace(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        # Builds a node tree from the table's paths.  Objects that open a
+        # scope get the line range get_scope() would return for them
+        paths = table.get("paths",[])
+        root = NamespaceNode("\\","\\")
+        if not paths:
+            return {"paths":paths,"root":root}
+        lines = table.get("lines",[])
+        hex_lines = self.get_hex_index(table=table)["lines"]
+        ends = self.get_scope_index(table=table)["ends"]
+        for path,line,obj_type in paths:
+            node = root
+            for name in path.lstrip("\\").split("."):
+                if not name in node.children:
+                    child_path = "\\"+name if node is root else node.path+"."+name
+                    node.children[name] = NamespaceNode(name,child_path,parent=node)
+                node = node.children[name]
+            node.definitions.append((line,obj_type))
+            if node.type is not None:
+                continue
+            node.type,node.line,node.end = obj_type,line,line
+            if obj_type == "Name":
+                continue
+            for index in range(line,len(lines)):
+                if hex_lines[index]: continue
+                if "{" in self.get_line(lines[index]):
+                    node.end = ends[index] if ends[index] != -1 else len(lines)-1
+                    break
+        return {"paths":paths,"root":root}
+
+    def get_namespace(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        namespace = table.get("namespace")
+        if not namespace or namespace["paths"] is not table.get("paths",[]):
+            namespace = table["namespace"] = self.build_namespace(table=table)
+        return namespace["root"]
+
+    def get_node(self, path, table=None):
+        # Returns the NamespaceNode for the passed fully qualified path, or
+        # None if nothing in the table is at or under it
+        node = self.get_namespace(table=table)
+        if not node: return None
+        for name in path.lstrip("\\").split("."):
+            if not name:
+                continue
+            node = node.children.get(name.rstrip("_") or name)
+            if node is None:
+                return None
+        return node
+
+    def has_path(self, path, table=None):
+        node = self.get_node(path,table=table)
+        return bool(node and node.definitions)
+
+    def get_child_paths(self, path, obj_type=None, table=None):
+        # Returns the paths of the objects directly under the passed path
+        node = self.get_node(path,table=table)
+        if not node: return []
+        return sorted(p for child in node.children.values() for p in child.get_paths() if obj_type is None or p[2] == obj_type)
+
+    def get_descendant_paths(self, path, obj="", obj_type=None, table=None):
+        # Returns the paths of everything under the passed path, optionally
+        # only those with the passed name and/or type
+        node = self.get_node(path,table=table)
+        if not node: return []
+        obj = obj.rstrip("_") or obj
+        return sorted(
+            p for child in node.walk() if not obj or child.name == obj
+            for p in child.get_paths() if obj_type is None or p[2] == obj_type
+        )
+
     def get_device_paths(self, obj="HPET",table=None):
         return self.get_path_of_type(obj_type="Device",obj=obj,table=table)
 
@@ -749,20 +1629,79 @@ class DSDT:
     def get_processor_paths(self, obj_type="Processor",table=None):
         return self.get_path_of_type(obj_type=obj_type,obj="",table=table)
 
-    def get_device_paths_with_hid(self, hid="ACPI000E", table=None):
+    def build_hid_index(self, table=None):
         if not table: table = self.get_dsdt_or_only()
-        if not table: return []
-        devs = []
-        for p in table.get("paths",[]):
+        if not table: return None
+        # Files every _HID and _CID line by each word in it.  An id made of
+        # word characters can only match inside a single word, so lookups
+        # only check the distinct words rather than every line.  The lines
+        # are kept as well for ids with other characters in them
+        paths = table.get("paths",[])
+        lines = table.get("lines",[])
+        index = {"paths":paths,"devices":{}}
+        for obj in ("_HID","_CID"):
+            index[obj] = {"lines":[],"words":{}}
+        for i,p in enumerate(paths):
+            if p[-1] == "Device":
+                index["devices"].setdefault(p[0],array("i")).append(i)
+            obj = p[0][-5:]
+            if not obj in ("._HID","._CID"):
+                continue
             try:
-                if p[0].endswith("._HID") and hid.upper() in table.get("lines")[p[1]]:
-                    # Save the path, strip the ._HID from the end
-                    devs.append(p[0][:-len("._HID")])
+                line = lines[p[1]]
             except: continue
+            device = p[0][:-5]
+            index[obj[1:]]["lines"].append((line,device))
+            for word in set(re.findall(r"\w+",line)):
+                index[obj[1:]]["words"].setdefault(word,[]).append(device)
+        return index
+
+    def get_hid_index(self, table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return None
+        hid_index = table.get("hid_index")
+        if not hid_index or hid_index["paths"] is not table.get("paths",[]):
+            hid_index = table["hid_index"] = self.build_hid_index(table=table)
+        return hid_index
+
+    def get_device_paths_with_id(self, hid="ACPI000E", obj="_HID", table=None):
+        if not table: table = self.get_dsdt_or_only()
+        if not table: return []
+        return list(self.memoize(
+            (id(table),"device_paths_with_id",hid,obj),
+            lambda: self._get_device_paths_with_id(hid,obj,table),
+            table=table
+        ))
+
+    def _get_device_paths_with_id(self, hid, obj, table):
+        hid_index = self.get_hid_index(table=table)
+        hid = hid.upper()
+        words = hid_index[obj]["words"]
+        if re.fullmatch(r"\w+",hid):
+            devs = [device for word in words if hid in word for device in words[word]]
+        else:
+            devs = [device for line,device in hid_index[obj]["lines"] if hid in line]
+        # Return the matching devices in the order they were defined
+        indexes = sorted(set(i for device in set(devs) for i in hid_index["devices"].get(device,[])))
+        return [hid_index["paths"][i] for i in indexes]
+
+    def get_device_paths_with_hid(self, hid="ACPI000E", table=None):
+        return self.get_device_paths_with_id(hid=hid,obj="_HID",table=table)
+
+    def get_device_paths_with_cid(self, cid="PNP0C09", table=None):
+        return self.get_device_paths_with_id(hid=cid,obj="_CID",table=table)
+
+    def get_devices_with_hid(self, hid="ACPI000E", include_cid=False):
+        # Looks the id up in every loaded table that has paths, returning a
+        # list of (table name, device path tuple) in table order
         devices = []
-        # Walk the paths again - and save any devices
-        # that match our prior list
-        for p in table.get("paths",[]):
-            if p[0] in devs and p[-1] == "Device":
-                devices.append(p)
+        self.materialize_tables()
+        for name in sorted(self.acpi_tables):
+            table = self.acpi_tables[name]
+            if not table.get("paths"):
+                continue
+            matches = self.get_device_paths_with_hid(hid,table=table)
+            if include_cid:
+                matches = sorted(set(matches + self.get_device_paths_with_cid(hid,table=table)))
+            devices.extend((name,p) for p in matches)
         return devices
\ No newline at end of file
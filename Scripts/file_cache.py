@@ -0,0 +1,124 @@
+import os
+import hashlib
+import tempfile
+import threading
+
+class FileCache:
+    def __init__(self, cache_dir, max_size = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # Running size of the entries - None until the first prune walks the
+        # directory to count it
+        self.total_size = None
+
+    def get_key(self, *parts):
+        # Hashes the passed parts - bytes or strings - into a single key
+        hasher = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = str(part).encode("utf-8")
+            hasher.update(hashlib.sha256(part).digest())
+        return hasher.hexdigest()
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        path = self._get_path(key)
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except Exception:
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path, None)
+        except Exception:
+            pass
+
+        return data
+
+    def set(self, key, data):
+        path = self._get_path(key)
+        old_size = self._get_size(path)
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print("Failed to write cache entry: {}".format(e))
+            return False
+
+        with self.lock:
+            if self.total_size is not None:
+                self.total_size += len(data) - old_size
+            needs_prune = self.total_size is None or self.total_size > self.max_size
+        if needs_prune:
+            self.prune()
+        return True
+
+    def remove(self, key):
+        path = self._get_path(key)
+        size = self._get_size(path)
+        try:
+            os.remove(path)
+        except Exception:
+            return
+        with self.lock:
+            if self.total_size is not None:
+                self.total_size -= size
+
+    def _get_size(self, path):
+        try:
+            return os.stat(path).st_size
+        except Exception:
+            return 0
+
+    def prune(self):
+        # Evicts the least recently used entries until we're under max_size
+        with self.lock:
+            entries = []
+            total_size = 0
+
+            for root, dirs, files in os.walk(self.cache_dir):
+                for file in files:
+                    # Skip other writers' in-flight temp files
+                    if file.startswith(".tmp_"):
+                        continue
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except Exception:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total_size += stat.st_size
+
+            for mtime, size, path in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                    total_size -= size
+                except Exception:
+                    pass
+
+            # Resync the running total - other processes may share the cache
+            self.total_size = total_size
+
+    def clear(self):
+        with self.lock:
+            if os.path.isdir(self.cache_dir):
+                for root, dirs, files in os.walk(self.cache_dir):
+                    for file in files:
+                        try:
+                            os.remove(os.path.join(root, file))
+                        except Exception:
+                            pass
+            self.total_size = 0
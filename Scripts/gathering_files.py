@@ -3,10 +3,13 @@ from Scripts import kext_maestro
 from Scripts import integrity_checker
 from Scripts import resource_fetcher
 from Scripts import utils
+import contextlib
+import io
 import os
 import shutil
 import subprocess
 import platform
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 os_name = platform.system()
 
@@ -42,10 +45,13 @@ class gatheringFiles:
         sorted_history = sorted(local_download_history.values(), key=lambda x: x.get("product_name", ""))
         self.utils.write_file(self.download_history_file, sorted_history)
 
-    def fetch_latest_products_info(self, kexts, local_download_history):
+    def fetch_latest_products_info(self, kexts, local_download_history, max_workers=8):
         latest_products = {k: v.copy() for k, v in local_download_history.items()}
         dortania_builds_data = self.fetcher.fetch_and_parse_content(self.dortania_builds_url, "json")
         seen_repos = set()
+        # Product info in the order it's merged - either a dict, or the
+        # (owner, repo) of a release that's resolved in the pool
+        sources = []
 
         def add_product_info(products):
             if isinstance(products, dict):
@@ -68,20 +74,33 @@ class gatheringFiles:
             if kext.download_info:
                 if not kext.download_info.get("sha256"):
                     kext.download_info["sha256"] = None
-                add_product_info({"product_name": kext.name, **kext.download_info})
+                sources.append({"product_name": kext.name, **kext.download_info})
             elif kext.github_repo and kext.github_repo.get("repo") not in seen_repos:
                 name = kext.github_repo.get("repo")
                 seen_repos.add(name)
                 if name in dortania_builds_data:
-                    add_product_info({
+                    sources.append({
                         "product_name": name,
                         "id": dortania_builds_data[name]["versions"][0]["release"]["id"], 
                         "url": dortania_builds_data[name]["versions"][0]["links"]["release"],
                         "sha256": dortania_builds_data[name]["versions"][0]["hashes"]["release"]["sha256"]
                     })
                 else:
-                    latest_release = self.github.get_latest_release(kext.github_repo.get("owner"), kext.github_repo.get("repo")) or {}
-                    add_product_info(latest_release.get("assets"))
+                    sources.append((kext.github_repo.get("owner"), name))
+
+        releases = {}
+        repos = set(source for source in sources if isinstance(source, tuple))
+        if repos:
+            # Each release costs two page fetches, so resolve them all at once
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(repos))) as executor:
+                releases = {repo: executor.submit(self.github.get_latest_release, *repo) for repo in repos}
+
+        for source in sources:
+            if isinstance(source, tuple):
+                latest_release = releases[source].result() or {}
+                add_product_info(latest_release.get("assets"))
+            else:
+                add_product_info(source)
 
         add_product_info({
             "product_name": "OpenCorePkg",
@@ -147,7 +166,61 @@ class gatheringFiles:
         
         return True
     
-    def gather_bootloader_kexts(self, kexts, macos_version):
+    def _install_product(self, job):
+        product_name = job["product_name"]
+        zip_path = job["zip_path"]
+
+        self.utils.extract_zip_file(zip_path)
+        self.utils.create_folder(job["asset_dir"], remove_content=True)
+        
+        dirs_to_scan = [os.path.join(self.temporary_dir, product_name)]
+        while dirs_to_scan:
+            current_dir = dirs_to_scan.pop()
+            if not os.path.isdir(current_dir):
+                continue
+            
+            for item in os.listdir(current_dir):
+                item_path = os.path.join(current_dir, item)
+                if os.path.isdir(item_path):
+                    dirs_to_scan.append(item_path)
+                elif item.lower().endswith(".zip"):
+                    self.utils.extract_zip_file(item_path)
+                    os.remove(item_path)
+                    dirs_to_scan.append(os.path.splitext(item_path)[0])
+
+        if "OpenCore" in product_name:
+            self.utils.extract_zip_file(os.path.join(self.temporary_dir, "OcBinaryData.zip"))
+
+        return self.move_bootloader_kexts_to_product_directory(product_name)
+
+    def _print_download_progress(self, downloads, previous_lines=0):
+        lines = []
+        finished = 0
+        for name, state in downloads.items():
+            downloaded = state["downloaded"]
+            total_size = state["total"]
+            if state["status"] != "Downloading":
+                progress = state["status"]
+                finished += state["status"] != "Queued"
+            elif total_size:
+                bar_length = 30
+                filled = min(int(bar_length * downloaded / total_size), bar_length)
+                bar = "█" * filled + "░" * (bar_length - filled)
+                progress = "[{}] {:3d}% {:.1f}/{:.1f}MB".format(bar, min(int(downloaded / total_size * 100), 100), downloaded/(1024*1024), total_size/(1024*1024))
+            else:
+                progress = "{:.1f}MB downloaded".format(downloaded/(1024*1024))
+            lines.append("  {:<24} {}".format(name[:24], progress))
+        lines.append("")
+        lines.append("  {} of {} downloads finished".format(finished, len(downloads)))
+
+        # Redraw the block in place
+        if previous_lines:
+            print("\033[{}F".format(previous_lines), end="")
+        for line in lines:
+            print("\033[K" + line)
+        return len(lines)
+
+    def gather_bootloader_kexts(self, kexts, macos_version, max_workers=4):
         self.utils.head("Gathering Files")
         print("")
         print("Please wait for download OpenCorePkg, kexts and macserial...")
@@ -158,6 +231,8 @@ class gatheringFiles:
         self.utils.create_folder(self.temporary_dir)
 
         seen_download_urls = set()
+        jobs = []
+        missing_url_product = None
 
         for product in kexts + [{"Name": "OpenCorePkg"}]:
             if not isinstance(product, dict) and not product.checked:
@@ -217,68 +292,141 @@ class gatheringFiles:
                     print(f"\nLatest version of {product_name} already downloaded.")
                     continue
 
+            if not product_download_url:
+                # Everything queued before this product still gets installed
+                missing_url_product = product_name
+                break
+
+            jobs.append({
+                "product_name": product_name,
+                "product_id": product_id,
+                "url": product_download_url,
+                "sha256": sha256_hash,
+                "history_item": history_item,
+                "asset_dir": asset_dir,
+                "manifest_path": manifest_path,
+                "zip_path": os.path.join(self.temporary_dir, product_name) + ".zip"
+            })
+
+        downloads = {}
+        for job in jobs:
+            downloads[job["product_name"]] = {"status": "Queued", "downloaded": 0, "total": None}
             print("")
-            print("Updating" if history_item is not None else "Please wait for download", end=" ")
-            print("{}...".format(product_name))
-            if product_download_url:
-                print("from {}".format(product_download_url))
-                print("")
-            else:
-                print("")
-                print("Could not find download URL for {}.".format(product_name))
-                print("")
-                self.utils.request_input()
-                shutil.rmtree(self.temporary_dir, ignore_errors=True)
-                return False
+            print("Updating" if job["history_item"] is not None else "Please wait for download", end=" ")
+            print("{}...".format(job["product_name"]))
+            print("from {}".format(job["url"]))
+
+        # OpenCorePkg can't be installed without OcBinaryData
+        opencore_job = next((job for job in jobs if "OpenCore" in job["product_name"]), None)
+        if opencore_job:
+            downloads["OcBinaryData"] = {"status": "Queued", "downloaded": 0, "total": None}
+            print("")
+            print("Please wait for download OcBinaryData...")
+            print("from {}".format(self.ocbinarydata_url))
 
-            zip_path = os.path.join(self.temporary_dir, product_name) + ".zip"
-            if not self.fetcher.download_and_save_file(product_download_url, zip_path, sha256_hash):
-                folder_is_valid, _ = self.integrity_checker.verify_folder_integrity(asset_dir, manifest_path)
-                if history_item is not None and folder_is_valid:
-                    print("Using previously downloaded version of {}.".format(product_name))
-                    continue
-                else:
-                    raise Exception("Could not download {} at this time. Please try again later.".format(product_name))
-            
-            self.utils.extract_zip_file(zip_path)
-            self.utils.create_folder(asset_dir, remove_content=True)
-            
-            dirs_to_scan = [os.path.join(self.temporary_dir, product_name)]
-            while dirs_to_scan:
-                current_dir = dirs_to_scan.pop()
-                if not os.path.isdir(current_dir):
-                    continue
-                
-                for item in os.listdir(current_dir):
-                    item_path = os.path.join(current_dir, item)
-                    if os.path.isdir(item_path):
-                        dirs_to_scan.append(item_path)
-                    elif item.lower().endswith(".zip"):
-                        self.utils.extract_zip_file(item_path)
-                        os.remove(item_path)
-                        dirs_to_scan.append(os.path.splitext(item_path)[0])
-
-            if "OpenCore" in product_name:
-                oc_binary_data_zip_path = os.path.join(self.temporary_dir, "OcBinaryData.zip")
-                print("")
-                print("Please wait for download OcBinaryData...")
-                print("from {}".format(self.ocbinarydata_url))
-                print("")
-                self.fetcher.download_and_save_file(self.ocbinarydata_url, oc_binary_data_zip_path)
-
-                if not os.path.exists(oc_binary_data_zip_path):
-                    print("")
-                    print("Could not download OcBinaryData at this time.")
-                    print("Please try again later.\n")
-                    self.utils.request_input()
-                    shutil.rmtree(self.temporary_dir, ignore_errors=True)
-                    return False
-                
-                self.utils.extract_zip_file(oc_binary_data_zip_path)
+        error = None
+        opencore_skipped = False
+        # Anything printed mid-install would land inside the progress block
+        # as it's redrawn, so it's held until the block is done
+        install_output = io.StringIO()
+
+        if downloads:
+            print("")
 
-            if self.move_bootloader_kexts_to_product_directory(product_name):
-                self.integrity_checker.generate_folder_manifest(asset_dir, manifest_path)
-                self._save_download_history(local_download_history, product_name, product_id, product_download_url, sha256_hash)
+            def download(name, url, destination_path, sha256_hash=None):
+                state = downloads[name]
+
+                def progress_callback(downloaded, total_size):
+                    state["downloaded"] = downloaded
+                    state["total"] = total_size
+
+                state["status"] = "Downloading"
+                return self.fetcher.download_and_save_file(url, destination_path, sha256_hash, progress_callback=progress_callback)
+
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(downloads)))) as executor:
+                pending = {}
+                for job in jobs:
+                    pending[executor.submit(download, job["product_name"], job["url"], job["zip_path"], job["sha256"])] = job
+                ocbinarydata_future = None
+                if opencore_job:
+                    ocbinarydata_future = executor.submit(download, "OcBinaryData", self.ocbinarydata_url, os.path.join(self.temporary_dir, "OcBinaryData.zip"))
+
+                printed_lines = self._print_download_progress(downloads)
+                waiting = set(pending)
+                if ocbinarydata_future:
+                    waiting.add(ocbinarydata_future)
+
+                while waiting:
+                    done, waiting = wait(waiting, timeout=0.5, return_when=FIRST_COMPLETED)
+
+                    if ocbinarydata_future in done and not ocbinarydata_future.cancelled():
+                        downloads["OcBinaryData"]["status"] = "Done" if ocbinarydata_future.result() else "Failed"
+
+                    finished = [future for future in pending if future.done() and not future.cancelled()]
+                    for future in finished:
+                        job = pending[future]
+                        state = downloads[job["product_name"]]
+
+                        # OpenCorePkg waits for OcBinaryData before it's installed
+                        if job is opencore_job and future.result() and ocbinarydata_future is not None and not ocbinarydata_future.done():
+                            continue
+                        pending.pop(future)
+
+                        if not future.result():
+                            folder_is_valid, _ = self.integrity_checker.verify_folder_integrity(job["asset_dir"], job["manifest_path"])
+                            if job["history_item"] is not None and folder_is_valid:
+                                state["status"] = "Failed, using previously downloaded version"
+                                continue
+                            state["status"] = "Failed"
+                            if error is None:
+                                error = Exception("Could not download {} at this time. Please try again later.".format(job["product_name"]))
+                                # Let in-flight downloads finish, drop the rest
+                                for other in waiting:
+                                    if other.cancel():
+                                        name = pending.get(other, {}).get("product_name", "OcBinaryData")
+                                        downloads[name]["status"] = "Cancelled"
+                            continue
+
+                        # Check the future itself - OcBinaryData may have been
+                        # cancelled or failed earlier in this same pass
+                        if job is opencore_job and (ocbinarydata_future.cancelled() or not ocbinarydata_future.result()):
+                            state["status"] = "Skipped"
+                            opencore_skipped = True
+                            continue
+
+                        state["status"] = "Installing"
+                        printed_lines = self._print_download_progress(downloads, printed_lines)
+                        with contextlib.redirect_stdout(install_output):
+                            installed = self._install_product(job)
+                        if installed:
+                            self.integrity_checker.generate_folder_manifest(job["asset_dir"], job["manifest_path"])
+                            self._save_download_history(local_download_history, job["product_name"], job["product_id"], job["url"], job["sha256"])
+                        state["status"] = "Done"
+
+                    printed_lines = self._print_download_progress(downloads, printed_lines)
+
+        if install_output.getvalue():
+            print("")
+            print(install_output.getvalue(), end="")
+
+        if error is not None:
+            raise error
+
+        if opencore_skipped:
+            print("")
+            print("Could not download OcBinaryData at this time.")
+            print("Please try again later.\n")
+            self.utils.request_input()
+            shutil.rmtree(self.temporary_dir, ignore_errors=True)
+            return False
+
+        if missing_url_product is not None:
+            print("")
+            print("Could not find download URL for {}.".format(missing_url_product))
+            print("")
+            self.utils.request_input()
+            shutil.rmtree(self.temporary_dir, ignore_errors=True)
+            return False
 
         shutil.rmtree(self.temporary_dir, ignore_errors=True)
         return True
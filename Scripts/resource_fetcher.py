@@ -1,3 +1,4 @@
+from Scripts import file_cache
 from Scripts import integrity_checker
 from Scripts import utils
 import ssl
@@ -9,23 +10,55 @@ import sys
 import gzip
 import zlib
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 
 if sys.version_info >= (3, 0):
-    from urllib.request import urlopen, Request
-    from urllib.error import URLError
+    from urllib.request import urlopen, Request, getproxies
+    from urllib.error import URLError, HTTPError
+    from urllib.parse import urlsplit, urljoin
+    import http.client as http_client
 else:
     import urllib2
-    from urllib2 import urlopen, Request, URLError
+    from urllib2 import urlopen, Request, URLError, HTTPError
+    http_client = None
 
 MAX_ATTEMPTS = 3
+MAX_CONNECTIONS_PER_HOST = 6
+MAX_REDIRECTS = 10
+# Seconds to wait for a free connection slot to a host before giving up
+POOL_TIMEOUT = 2 * 60
+# Seconds a cached response is used without asking the server again
+CACHE_TTL = 5 * 60
+# Downloads at least this large are fetched as parallel ranged segments
+SEGMENT_THRESHOLD = 16 * 1024 * 1024
+MAX_SEGMENTS = 4
 
 class ResourceFetcher:
-    def __init__(self, headers=None):
+    # Shared by every instance so each host keeps its connections alive
+    # across the whole process
+    shared_ssl_context = None
+    max_connections_per_host = MAX_CONNECTIONS_PER_HOST
+    idle_connections = {}
+    host_semaphores = {}
+    pool_lock = threading.Lock()
+
+    def __init__(self, headers=None, max_connections_per_host=None, cache_ttl=CACHE_TTL):
         self.request_headers = headers or {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
         }
         self.buffer_size = 16 * 1024
-        self.ssl_context = self.create_ssl_context()
+        with ResourceFetcher.pool_lock:
+            if ResourceFetcher.shared_ssl_context is None:
+                ResourceFetcher.shared_ssl_context = self.create_ssl_context()
+            if max_connections_per_host:
+                # Hosts already in use keep the limit they started with
+                ResourceFetcher.max_connections_per_host = max_connections_per_host
+        self.ssl_context = ResourceFetcher.shared_ssl_context
+        # Fetched content is cached with its validators so repeat runs can
+        # revalidate instead of downloading it again
+        self.http_cache = file_cache.FileCache(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "Cache", "HTTP"))
+        self.cache_ttl = cache_ttl
         self.integrity_checker = integrity_checker.IntegrityChecker()
         self.utils = utils.Utils()
 
@@ -41,16 +74,122 @@ class ResourceFetcher:
             ssl_context = ssl._create_unverified_context()
         return ssl_context
 
-    def _make_request(self, resource_url, timeout=10):
+    def _acquire_connection(self, scheme, host, timeout):
+        key = (scheme, host)
+        with ResourceFetcher.pool_lock:
+            semaphore = ResourceFetcher.host_semaphores.get(key)
+            if semaphore is None:
+                semaphore = ResourceFetcher.host_semaphores[key] = threading.BoundedSemaphore(ResourceFetcher.max_connections_per_host)
+        if not semaphore.acquire(timeout=POOL_TIMEOUT):
+            raise socket.timeout("Timed out waiting for a connection to {}".format(host))
+
+        with ResourceFetcher.pool_lock:
+            idle = ResourceFetcher.idle_connections.get(key)
+            connection = idle.pop() if idle else None
+
+        if connection is not None:
+            connection.timeout = timeout
+            if connection.sock:
+                connection.sock.settimeout(timeout)
+            return key, connection, True
+
+        if scheme == "https":
+            connection = http_client.HTTPSConnection(host, timeout=timeout, context=self.ssl_context)
+        else:
+            connection = http_client.HTTPConnection(host, timeout=timeout)
+        return key, connection, False
+
+    def _release_connection(self, key, connection, reusable):
+        if reusable:
+            with ResourceFetcher.pool_lock:
+                ResourceFetcher.idle_connections.setdefault(key, []).append(connection)
+        else:
+            connection.close()
+        ResourceFetcher.host_semaphores[key].release()
+
+    def release_response(self, response, reusable=True):
+        # Hands a pooled connection back once its response is done with -
+        # anything left unread, or a failed read, means the connection
+        # can't be reused
+        pooled = getattr(response, "pooled_connection", None)
+        if not pooled:
+            return
+        response.pooled_connection = None
+        key, connection = pooled
+        self._release_connection(key, connection, reusable and response.isclosed() and not response.will_close)
+
+    def discard_response(self, response):
+        # Reads off a body we don't need so the connection can be reused
+        reusable = False
+        try:
+            response.read()
+            reusable = True
+        except Exception:
+            pass
+        finally:
+            self.release_response(response, reusable)
+
+    def _pooled_request(self, resource_url, headers, timeout):
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(resource_url)
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+
+            key, connection, reused = self._acquire_connection(parts.scheme, parts.netloc, timeout)
+            try:
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                except (http_client.RemoteDisconnected, ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+                    if not reused:
+                        raise
+                    # The server dropped an idle connection - retry on a fresh one
+                    connection.close()
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+            except BaseException:
+                self._release_connection(key, connection, False)
+                raise
+
+            response.pooled_connection = (key, connection)
+            response.url = resource_url
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                resource_url = urljoin(resource_url, response.getheader("Location"))
+                self.discard_response(response)
+                continue
+
+            if response.status >= 400:
+                self.discard_response(response)
+                raise HTTPError(resource_url, response.status, response.reason, response.msg, None)
+
+            return response
+
+        raise URLError("Too many redirects")
+
+    def _make_request(self, resource_url, timeout=10, headers=None):
         try:
+            extra_headers = headers or {}
             headers = dict(self.request_headers)
             headers["Accept-Encoding"] = "gzip, deflate"
-            
-            return urlopen(Request(resource_url, headers=headers), timeout=timeout, context=self.ssl_context)
+            headers.update(extra_headers)
+
+            # Proxies and non-HTTP schemes go through urllib as before
+            if http_client is None or getproxies() or not urlsplit(resource_url).scheme in ("http", "https"):
+                return urlopen(Request(resource_url, headers=headers), timeout=timeout, context=self.ssl_context)
+
+            return self._pooled_request(resource_url, headers, timeout)
         except socket.timeout as e:
             print("Timeout error: {}".format(e))
         except ssl.SSLError as e:
             print("SSL error: {}".format(e))
+        except HTTPError as e:
+            # urllib raises for 304 and 416, but they answer conditional and
+            # ranged requests
+            if e.code in (304, 416):
+                return e
+            print("Connection error: {}".format(e))
         except (URLError, socket.gaierror) as e:
             print("Connection error: {}".format(e))
         except Exception as e:
@@ -58,28 +197,84 @@ class ResourceFetcher:
 
         return None
 
-    def fetch_and_parse_content(self, resource_url, content_type=None):
+    def _get_cached_content(self, resource_url):
+        # Returns a tuple of (metadata, content) or None
+        data = self.http_cache.get(self.http_cache.get_key("HTTP", resource_url))
+        if not data:
+            return None
+        try:
+            metadata, content = data.split(b"\n", 1)
+            return (json.loads(metadata), content)
+        except Exception:
+            return None
+
+    def _set_cached_content(self, resource_url, metadata, content):
+        return self.http_cache.set(self.http_cache.get_key("HTTP", resource_url), json.dumps(metadata).encode("utf-8") + b"\n" + content)
+
+    def _parse_content(self, content, content_type=None):
+        try:
+            if content_type == "json":
+                return json.loads(content)
+            elif content_type == "plist":
+                return plistlib.loads(content)
+            else:
+                return content.decode("utf-8")
+        except Exception as e:
+            print("Error parsing content as {}: {}".format(content_type, e))
+            
+        return None
+
+    def fetch_and_parse_content(self, resource_url, content_type=None, use_cache=True):
+        cached = self._get_cached_content(resource_url) if use_cache else None
+        if cached and time.time() - cached[0].get("fetched", 0) < self.cache_ttl:
+            return self._parse_content(cached[1], content_type)
+
+        # Revalidate whatever we have rather than fetching it all again
+        conditional_headers = {}
+        if cached:
+            if cached[0].get("etag"):
+                conditional_headers["If-None-Match"] = cached[0]["etag"]
+            if cached[0].get("last_modified"):
+                conditional_headers["If-Modified-Since"] = cached[0]["last_modified"]
+
         attempt = 0
         response = None
 
         while attempt < 3:
-            response = self._make_request(resource_url)
+            response = self._make_request(resource_url, headers=conditional_headers)
 
             if not response:
                 attempt += 1
                 print("Failed to fetch content from {}. Retrying...".format(resource_url))
                 continue
 
-            if response.getcode() == 200:
+            if response.getcode() == 200 or (cached and response.getcode() == 304):
                 break
 
             attempt += 1
+            if attempt < 3:
+                self.discard_response(response)
 
         if not response:
+            if cached:
+                print("Using cached content for {}".format(resource_url))
+                return self._parse_content(cached[1], content_type)
             print("Failed to fetch content from {}".format(resource_url))
             return None
         
-        content = response.read()
+        reusable = False
+        try:
+            content = response.read()
+            reusable = True
+        finally:
+            self.release_response(response, reusable)
+
+        if cached and response.getcode() == 304:
+            # Not modified - keep the cached body and restart its TTL
+            metadata, content = cached
+            metadata["fetched"] = time.time()
+            self._set_cached_content(resource_url, metadata, content)
+            return self._parse_content(content, content_type)
 
         if response.info().get("Content-Encoding") == "gzip" or content.startswith(b"\x1f\x8b"):
             try:
@@ -92,103 +287,271 @@ class ResourceFetcher:
             except Exception as e:
                 print("Failed to decompress deflate content: {}".format(e))
         
-        try:
-            if content_type == "json":
-                return json.loads(content)
-            elif content_type == "plist":
-                return plistlib.loads(content)
-            else:
-                return content.decode("utf-8")
-        except Exception as e:
-            print("Error parsing content as {}: {}".format(content_type, e))
-            
-        return None
+        result = self._parse_content(content, content_type)
 
-    def _download_with_progress(self, response, local_file):
-        total_size = response.getheader("Content-Length")
-        if total_size:
-            total_size = int(total_size)
-        bytes_downloaded = 0
-        start_time = time.time()
-        last_time = start_time
-        last_bytes = 0
-        speeds = []
-
-        speed_str = "-- KB/s"
+        if use_cache and response.getcode() == 200 and result is not None:
+            self._set_cached_content(resource_url, {
+                "url": resource_url,
+                "etag": response.info().get("ETag"),
+                "last_modified": response.info().get("Last-Modified"),
+                "fetched": time.time()
+            }, content)
+
+        return result
+
+    def _new_progress(self, bytes_downloaded=0):
+        return {
+            "last_time": time.time(),
+            "last_bytes": bytes_downloaded,
+            "speeds": [],
+            "speed_str": "-- KB/s"
+        }
+
+    def _show_progress(self, progress, bytes_downloaded, total_size, progress_callback=None):
+        if progress_callback:
+            # The caller draws its own progress
+            progress_callback(bytes_downloaded, total_size)
+            return
+
+        current_time = time.time()
+        time_diff = current_time - progress["last_time"]
         
-        while True:
-            chunk = response.read(self.buffer_size)
-            if not chunk:
-                break
-            local_file.write(chunk)
-            bytes_downloaded += len(chunk)
-            
-            current_time = time.time()
-            time_diff = current_time - last_time
-            
-            if time_diff > 0.5:
-                current_speed = (bytes_downloaded - last_bytes) / time_diff
-                speeds.append(current_speed)
-                if len(speeds) > 5:
-                    speeds.pop(0)
-                avg_speed = sum(speeds) / len(speeds)
-                
-                if avg_speed < 1024*1024:
-                    speed_str = "{:.1f} KB/s".format(avg_speed/1024)
-                else:
-                    speed_str = "{:.1f} MB/s".format(avg_speed/(1024*1024))
-                
-                last_time = current_time
-                last_bytes = bytes_downloaded
+        if time_diff > 0.5:
+            speeds = progress["speeds"]
+            current_speed = (bytes_downloaded - progress["last_bytes"]) / time_diff
+            speeds.append(current_speed)
+            if len(speeds) > 5:
+                speeds.pop(0)
+            avg_speed = sum(speeds) / len(speeds)
             
-            if total_size:
-                percent = int(bytes_downloaded / total_size * 100)
-                bar_length = 40
-                filled = int(bar_length * bytes_downloaded / total_size)
-                bar = "█" * filled + "░" * (bar_length - filled)
-                progress = "{} [{}] {:3d}% {:.1f}/{:.1f}MB".format(speed_str, bar, percent, bytes_downloaded/(1024*1024), total_size/(1024*1024))
+            if avg_speed < 1024*1024:
+                progress["speed_str"] = "{:.1f} KB/s".format(avg_speed/1024)
             else:
-                progress = "{} {:.1f}MB downloaded".format(speed_str, bytes_downloaded/(1024*1024))
-            
-            print(" " * 80, end="\r")
-            print(progress, end="\r")
+                progress["speed_str"] = "{:.1f} MB/s".format(avg_speed/(1024*1024))
             
-        print()
+            progress["last_time"] = current_time
+            progress["last_bytes"] = bytes_downloaded
+        
+        speed_str = progress["speed_str"]
+        if total_size:
+            percent = int(bytes_downloaded / total_size * 100)
+            bar_length = 40
+            filled = int(bar_length * bytes_downloaded / total_size)
+            bar = "█" * filled + "░" * (bar_length - filled)
+            line = "{} [{}] {:3d}% {:.1f}/{:.1f}MB".format(speed_str, bar, percent, bytes_downloaded/(1024*1024), total_size/(1024*1024))
+        else:
+            line = "{} {:.1f}MB downloaded".format(speed_str, bytes_downloaded/(1024*1024))
+        
+        print(" " * 80, end="\r")
+        print(line, end="\r")
+
+    def _download_with_progress(self, response, local_file, progress_callback=None, bytes_downloaded=0, total_size=None):
+        if total_size is None:
+            total_size = response.getheader("Content-Length")
+            if total_size:
+                total_size = int(total_size)
+        progress = self._new_progress(bytes_downloaded)
+        
+        try:
+            while True:
+                chunk = response.read(self.buffer_size)
+                if not chunk:
+                    break
+                local_file.write(chunk)
+                bytes_downloaded += len(chunk)
+                self._show_progress(progress, bytes_downloaded, total_size, progress_callback)
+        finally:
+            if not progress_callback:
+                print()
+
+        return bytes_downloaded
+
+    def _get_response_range(self, response):
+        # Returns a tuple of (first byte, total length) for the body - the
+        # total is None when the server doesn't say
+        if response.getcode() == 206:
+            content_range = response.getheader("Content-Range") or ""
+            try:
+                byte_range, total_size = content_range.split(" ", 1)[1].split("/")
+                return (int(byte_range.split("-")[0]), None if total_size == "*" else int(total_size))
+            except Exception:
+                return (None, None)
+        total_size = response.getheader("Content-Length")
+        return (0, int(total_size) if total_size else None)
 
-    def download_and_save_file(self, resource_url, destination_path, sha256_hash=None):
+    def _request_range(self, resource_url, start, end=None, etag=None):
+        # Ranged downloads must arrive byte for byte as stored
+        headers = {"Accept-Encoding": "identity"}
+        if start or end is not None:
+            headers["Range"] = "bytes={}-{}".format(start, "" if end is None else end - 1)
+            if etag:
+                # Get the whole file instead if it changed since
+                headers["If-Range"] = etag
+        return self._make_request(resource_url, headers=headers)
+
+    def _download_segment(self, resource_url, part_path, segment, etag, counter):
+        start, end, written = segment
+        if start + written >= end:
+            return True
+
+        response = self._request_range(resource_url, start + written, end, etag)
+        if not response:
+            return False
+
+        reusable = False
+        try:
+            if response.getcode() != 206 or self._get_response_range(response)[0] != start + written:
+                # The file changed under us - the caller starts over
+                raise ValueError("Server did not honour the range request for {}".format(resource_url))
+
+            with open(part_path, "r+b") as local_file:
+                local_file.seek(start + written)
+                while start + segment[2] < end:
+                    chunk = response.read(min(self.buffer_size, end - start - segment[2]))
+                    if not chunk:
+                        break
+                    local_file.write(chunk)
+                    segment[2] += len(chunk)
+                    with counter["lock"]:
+                        counter["bytes"] += len(chunk)
+            reusable = True
+        except ValueError:
+            raise
+        except Exception:
+            # Keep what we have - the next attempt resumes from here
+            pass
+        finally:
+            self.release_response(response, reusable)
+
+        return start + segment[2] >= end
+
+    def _download_segments(self, resource_url, part_path, state, progress_callback=None):
+        total_size = state["total"]
+        segments = state["segments"]
+        counter = {"lock": threading.Lock(), "bytes": sum(segment[2] for segment in segments)}
+        progress = self._new_progress(counter["bytes"])
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                futures = [executor.submit(self._download_segment, resource_url, part_path, segment, state["etag"], counter) for segment in segments]
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(pending, timeout=0.5)
+                    self._show_progress(progress, counter["bytes"], total_size, progress_callback)
+                return all(future.result() for future in futures)
+        finally:
+            if not progress_callback:
+                print()
+
+    def download_and_save_file(self, resource_url, destination_path, sha256_hash=None, progress_callback=None):
+        # Status messages are left to the caller when it tracks progress itself
+        log = print if not progress_callback else lambda *args, **kwargs: None
+        # Partial downloads are kept here between attempts, along with the
+        # validators that say it's still the same file
+        part_path = destination_path + ".part"
+        state = None
         attempt = 0
 
+        # Without its validators a leftover partial file is no use
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
         while attempt < MAX_ATTEMPTS:
             attempt += 1
-            response = self._make_request(resource_url)
 
-            if not response:
-                print("Failed to fetch content from {}. Retrying...".format(resource_url))
-                continue
+            if not (state and state["segments"]):
+                offset = os.path.getsize(part_path) if state and os.path.exists(part_path) else 0
+                response = self._request_range(resource_url, offset, etag=state and state["etag"])
+
+                if not response:
+                    log("Failed to fetch content from {}. Retrying...".format(resource_url))
+                    continue
+
+                start, total_size = self._get_response_range(response) if response.getcode() in (200, 206) else (None, None)
+                if start is None or (start and (start != offset or total_size != state["total"])):
+                    # Range not satisfiable, or it no longer matches what we have
+                    log("Could not resume download for {}. Restarting...".format(resource_url))
+                    self.discard_response(response)
+                    state = None
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    continue
+
+                if not start:
+                    state = {
+                        "etag": response.getheader("ETag"),
+                        "total": total_size,
+                        "segments": None
+                    }
+
+                    if total_size and total_size >= SEGMENT_THRESHOLD and state["etag"] and (response.getheader("Accept-Ranges") or "").lower() == "bytes":
+                        # Large enough to be worth splitting across several connections
+                        segment_size = -(-total_size // MAX_SEGMENTS)
+                        state["segments"] = [[begin, min(begin + segment_size, total_size), 0] for begin in range(0, total_size, segment_size)]
+                        self.release_response(response)
+                        with open(part_path, "wb") as local_file:
+                            local_file.truncate(total_size)
 
-            with open(destination_path, "wb") as local_file:
-                self._download_with_progress(response, local_file)
+                if not state["segments"]:
+                    interrupted = False
+                    try:
+                        with open(part_path, "ab" if start else "wb") as local_file:
+                            self._download_with_progress(response, local_file, progress_callback, bytes_downloaded=start, total_size=total_size)
+                    except Exception as e:
+                        log("Download interrupted: {}".format(e))
+                        interrupted = True
+                    finally:
+                        self.release_response(response, not interrupted)
+
+                    size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                    if total_size and size > total_size or not total_size and interrupted:
+                        # Nothing to check a resume against - start over
+                        os.remove(part_path)
+                        state = None
+                        continue
+                    if total_size and size < total_size:
+                        if attempt < MAX_ATTEMPTS:
+                            log("Download interrupted for {}. Resuming...".format(resource_url))
+                        continue
+
+            if state["segments"]:
+                try:
+                    complete = self._download_segments(resource_url, part_path, state, progress_callback)
+                except ValueError as e:
+                    log("{}. Restarting download...".format(e))
+                    state = None
+                    continue
+                if not complete:
+                    if attempt < MAX_ATTEMPTS:
+                        log("Download interrupted for {}. Resuming...".format(resource_url))
+                    continue
+
+            os.replace(part_path, destination_path)
+            state = None
 
             if os.path.exists(destination_path) and os.path.getsize(destination_path) > 0:
                 if sha256_hash:
-                    print("Verifying SHA256 checksum...")
+                    log("Verifying SHA256 checksum...")
                     downloaded_hash = self.integrity_checker.get_sha256(destination_path)
                     if downloaded_hash.lower() == sha256_hash.lower():
-                        print("Checksum verified successfully.")
+                        log("Checksum verified successfully.")
                         return True
                     else:
-                        print("Checksum mismatch! Removing file and retrying download...")
+                        log("Checksum mismatch! Removing file and retrying download...")
                         os.remove(destination_path)
                         continue
                 else:
-                    print("No SHA256 hash provided. Downloading file without verification.")
+                    log("No SHA256 hash provided. Downloading file without verification.")
                     return True
             
             if os.path.exists(destination_path):
                 os.remove(destination_path)
 
             if attempt < MAX_ATTEMPTS:
-                print("Download failed for {}. Retrying...".format(resource_url))
+                log("Download failed for {}. Retrying...".format(resource_url))
+
+        if os.path.exists(part_path):
+            os.remove(part_path)
 
-        print("Failed to download {} after {} attempts.".format(resource_url, MAX_ATTEMPTS))
+        log("Failed to download {} after {} attempts.".format(resource_url, MAX_ATTEMPTS))
         return False
\ No newline at end of file
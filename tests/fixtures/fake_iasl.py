@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Stand-in for iasl: "disassembles" tables by looking up the checked-in
+# listing for the same bytes, and "compiles" .dsl files to a digest so the
+# output is deterministic without the real toolchain
+import hashlib
+import os
+import sys
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "acpi")
+args = sys.argv[1:]
+if "-v" in args:
+    print("Intel ACPI Component Architecture\nASL+ Optimizing Compiler/Disassembler version 20240322")
+    sys.exit(0)
+files = []
+externals = False
+for arg in args:
+    if arg == "-e":
+        externals = True
+    elif arg.startswith("-"):
+        externals = False
+    elif not externals:
+        files.append(arg)
+listings = {}
+for name in os.listdir(fixtures):
+    if name.lower().endswith(".aml"):
+        with open(os.path.join(fixtures, name), "rb") as f:
+            listings[hashlib.sha256(f.read()).hexdigest()] = os.path.join(fixtures, os.path.splitext(name)[0] + ".dsl")
+rc = 0
+for path in files:
+    base = os.path.splitext(path)[0]
+    if path.lower().endswith(".dsl"):
+        with open(path) as f:
+            source = f.read()
+        if "SYNTAX_ERROR" in source:
+            rc = 1
+            continue
+        with open(base + ".aml", "wb") as f:
+            f.write(b"AMLC" + hashlib.sha256(source.encode()).digest())
+        continue
+    with open(path, "rb") as f:
+        listing = listings.get(hashlib.sha256(f.read()).hexdigest())
+    if listing is None:
+        rc = 1
+        continue
+    with open(listing) as src, open(base + ".dsl", "w") as dst:
+        dst.write(src.read())
+sys.exit(rc)
@@ -0,0 +1,94 @@
+import os
+import plistlib
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Scripts import acpi_guru
+from Scripts import dsdt
+from Scripts import file_cache
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+fake_iasl = os.path.join(fixtures, "fake_iasl.py")
+
+hardware_report = {
+    "Motherboard": {"Platform": "Laptop", "Name": "HP X", "Chipset": "Z390"},
+    "CPU": {"Codename": "Coffee Lake", "Manufacturer": "Intel", "Processor Name": "i7"},
+    "GPU": {"x": {"Device Type": "Integrated GPU", "Codename": "Coffee Lake", "Device ID": "8086-3E9B"}},
+    "System Devices": {},
+    "Network": {},
+    "Input": {}
+}
+
+class TestRunPatches(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        patcher = mock.patch.object(dsdt.DSDT, "check_iasl", lambda self, **kwargs: fake_iasl)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.checked = {patch.name: patch.checked for patch in acpi_guru.acpi_patch_data.patches}
+        self.addCleanup(self.restore_patches)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp, ignore_errors=True)
+
+    def restore_patches(self):
+        for patch in acpi_guru.acpi_patch_data.patches:
+            patch.checked = self.checked[patch.name]
+
+    def build(self, name, run_patches):
+        # Mirrors the ACPI part of build_opencore_efi and returns the
+        # config.plist bytes and the contents of the ACPI folder
+        guru = acpi_guru.ACPIGuru()
+        guru.acpi.cache = file_cache.FileCache(os.path.join(self.temp, name, "Cache", "ACPI"))
+        guru.ssdt_cache = file_cache.FileCache(os.path.join(self.temp, name, "Cache", "SSDT"))
+        guru.acpi.load(os.path.join(fixtures, "acpi", "DSDT.aml"))
+        guru.dsdt = guru.acpi.get_dsdt_or_only()
+        guru.hardware_report = hardware_report
+        guru.disabled_devices = {}
+        guru.smbios_model = "MacBookPro15,1"
+        guru.acpi_directory = os.path.join(self.temp, name, "ACPI")
+        guru.lpc_bus_device = guru.get_lpc_name()
+        guru.defer_ssdt_compile()
+        for patch in guru.patches:
+            patch.checked = patch.function_name != "drop_cpu_tables"
+
+        # Some SSDTs embed a random MAC address
+        random.seed(0)
+        if run_patches:
+            results = guru.run_patches()
+        else:
+            results = [(patch, getattr(guru, patch.function_name)()) for patch in guru.patches if patch.checked]
+
+        config_data = {"ACPI": {"Add": [], "Delete": [], "Patch": []}}
+        for patch, acpi_load in results:
+            if patch.name == "BATP" or not isinstance(acpi_load, dict):
+                continue
+            config_data["ACPI"]["Add"].extend(acpi_load.get("Add", []))
+            config_data["ACPI"]["Delete"].extend(acpi_load.get("Delete", []))
+            config_data["ACPI"]["Patch"].extend(acpi_load.get("Patch", []))
+        guru.update_ssdt_entries(config_data["ACPI"]["Add"], guru.compile_deferred_ssdts())
+        config_data["ACPI"]["Patch"].extend(guru.dsdt_patches)
+        config_data["ACPI"]["Patch"] = guru.apply_acpi_patches(config_data["ACPI"]["Patch"])
+
+        files = {}
+        for file_name in sorted(os.listdir(guru.acpi_directory)):
+            with open(os.path.join(guru.acpi_directory, file_name), "rb") as f:
+                files[file_name] = f.read()
+        return plistlib.dumps(config_data), files
+
+    def test_matches_serial(self):
+        serial_config, serial_files = self.build("serial", run_patches=False)
+        patched_config, patched_files = self.build("run_patches", run_patches=True)
+
+        self.assertTrue(serial_files)
+        self.assertEqual(serial_config, patched_config)
+        self.assertEqual(serial_files, patched_files)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Scripts import dsdt
+from Scripts import file_cache
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+fake_iasl = os.path.join(fixtures, "fake_iasl.py")
+
+class TestHexIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp, True)
+        with mock.patch.object(dsdt.DSDT, "check_iasl", lambda self, **kwargs: fake_iasl):
+            self.acpi = dsdt.DSDT()
+            self.acpi.cache = file_cache.FileCache(os.path.join(self.temp, "Cache"))
+            self.assertTrue(self.acpi.load(os.path.join(fixtures, "acpi", "DSDT.aml"))[0])
+        self.table = self.acpi.get_dsdt_or_only()
+        self.lines = self.table["lines"]
+        self.hex_lines = [index for index, line in enumerate(self.lines) if self.acpi.is_hex(line)]
+
+    def get_line_bytes(self, index):
+        return self.acpi.get_hex_bytes(self.lines[index].split("//")[0].split(":")[1].replace(" ", ""))
+
+    def test_offset_line_round_trip(self):
+        self.assertTrue(self.hex_lines)
+        raw = self.table["raw"]
+        for index in self.hex_lines:
+            offset = self.acpi.get_offset_for_line(index, table=self.table)
+            data = self.get_line_bytes(index)
+            self.assertEqual(raw[offset:offset + len(data)], data)
+            # Every byte on the line maps back to it
+            for x in range(offset, offset + len(data)):
+                self.assertEqual(self.acpi.get_line_for_offset(x, table=self.table), index)
+        self.assertEqual(self.acpi.get_line_for_offset(len(raw), table=self.table), -1)
+
+    def test_offset_for_asl_line(self):
+        # ASL lines map to the hex line the disassembler emits after them
+        for index, line in enumerate(self.lines):
+            if index in self.hex_lines:
+                continue
+            next_hex = next((x for x in self.hex_lines if x > index), None)
+            expected = -1 if next_hex is None else self.acpi.get_offset_for_line(next_hex, table=self.table)
+            self.assertEqual(self.acpi.get_offset_for_line(index, table=self.table), expected)
+
+    def test_raw_for_lines(self):
+        self.assertEqual(self.acpi.get_raw_for_lines(0, len(self.lines) - 1, table=self.table), self.table["raw"][36:])
+        for start, end in ((self.hex_lines[1], self.hex_lines[5]), (0, self.hex_lines[0] - 1)):
+            expected = b"".join(self.get_line_bytes(x) for x in self.hex_lines if start <= x <= end)
+            self.assertEqual(self.acpi.get_raw_for_lines(start, end, table=self.table), expected)
+
+    def test_hex_runs(self):
+        # Each run of hex lines comes back whole from any line inside it
+        runs = []
+        for index in self.hex_lines:
+            if runs and runs[-1][-1] == index - 1:
+                runs[-1].append(index)
+            else:
+                runs.append([index])
+        for run in runs:
+            expected = "".join(self.lines[x].split("//")[0].split(":")[1].replace(" ", "") for x in run)
+            self.assertEqual(self.acpi.find_next_hex(run[0] - 1, table=self.table), (expected, run[0], run[-1]))
+            self.assertEqual(self.acpi.get_hex_starting_at(run[0], table=self.table), (expected, run[-1]))
+            self.assertEqual(self.acpi.get_hex_ending_at(run[-1], table=self.table), (expected, run[0]))
+        self.assertEqual(self.acpi.find_next_hex(runs[-1][0], table=self.table), ("", -1, -1))
+
+class TestListingCache(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp, True)
+        with mock.patch.object(dsdt.DSDT, "check_iasl", lambda self, **kwargs: fake_iasl):
+            self.acpi = dsdt.DSDT()
+        self.acpi.cache = file_cache.FileCache(os.path.join(self.temp, "Cache"))
+        self.table_path = os.path.join(fixtures, "acpi", "DSDT.aml")
+
+    def test_key_covers_mode_and_version(self):
+        key = self.acpi.get_listing_cache_key(self.table_path, mode="da")
+        self.assertEqual(key, self.acpi.get_listing_cache_key(self.table_path, mode="da"))
+        self.assertNotEqual(key, self.acpi.get_listing_cache_key(self.table_path, mode="e"))
+        with mock.patch.object(dsdt, "CACHE_VERSION", dsdt.CACHE_VERSION + 1):
+            self.assertNotEqual(key, self.acpi.get_listing_cache_key(self.table_path, mode="da"))
+
+    def test_cached_scopes_share_lines(self):
+        self.assertTrue(self.acpi.load(self.table_path)[0])
+        cold = self.acpi.get_dsdt_or_only()
+        self.assertTrue(self.acpi.load(self.table_path)[0])
+        warm = self.acpi.get_dsdt_or_only()
+        self.assertIs(warm["scopes"].lines, warm["lines"])
+        self.assertEqual(list(warm["scopes"]), list(cold["scopes"]))
+        self.assertEqual(warm["paths"], cold["paths"])
+
+if __name__ == "__main__":
+    unittest.main()
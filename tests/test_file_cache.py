@@ -0,0 +1,72 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Scripts import file_cache
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp, True)
+        self.cache = file_cache.FileCache(self.temp, max_size=25)
+
+    def set_used(self, key, when):
+        os.utime(self.cache._get_path(key), (when, when))
+
+    def test_round_trip(self):
+        key = self.cache.get_key("ACPI", b"\x00\x01")
+        self.assertIsNone(self.cache.get(key))
+        self.assertTrue(self.cache.set(key, b"data"))
+        self.assertEqual(self.cache.get(key), b"data")
+        self.cache.remove(key)
+        self.assertIsNone(self.cache.get(key))
+
+    def test_evicts_least_recently_used(self):
+        a, b, c = (self.cache.get_key(x) for x in "abc")
+        self.cache.set(a, b"a" * 10)
+        self.cache.set(b, b"b" * 10)
+        self.set_used(a, 100)
+        self.set_used(b, 200)
+        # Reading a makes b the least recently used
+        self.assertEqual(self.cache.get(a), b"a" * 10)
+        self.cache.set(c, b"c" * 10)
+        self.assertIsNone(self.cache.get(b))
+        self.assertEqual(self.cache.get(a), b"a" * 10)
+        self.assertEqual(self.cache.get(c), b"c" * 10)
+
+    def test_walks_only_over_max_size(self):
+        a, b, c = (self.cache.get_key(x) for x in "abc")
+        self.cache.set(a, b"a" * 10)
+        with mock.patch.object(file_cache.os, "walk", wraps=os.walk) as walk:
+            self.cache.set(b, b"b" * 10)
+            self.cache.set(b, b"b" * 5)
+            self.assertEqual(walk.call_count, 0)
+            self.cache.set(c, b"c" * 20)
+            self.assertEqual(walk.call_count, 1)
+        self.assertLessEqual(self.cache.total_size, 25)
+
+    def test_skips_temp_files(self):
+        key = self.cache.get_key("a")
+        self.cache.set(key, b"a" * 10)
+        temp_path = os.path.join(self.temp, key[:2], ".tmp_writer")
+        with open(temp_path, "wb") as f:
+            f.write(b"t" * 30)
+        self.set_used(key, 100)
+        os.utime(temp_path, (0, 0))
+        self.cache.prune()
+        self.assertTrue(os.path.exists(temp_path))
+        self.assertEqual(self.cache.get(key), b"a" * 10)
+
+    def test_clear(self):
+        key = self.cache.get_key("a")
+        self.cache.set(key, b"a")
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(key))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+if sys.version_info >= (3, 0):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Scripts import file_cache
+from Scripts import resource_fetcher
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if self.path == "/json":
+            if self.headers.get("If-None-Match") == server.etag:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            return self.send_body(b'{"a": 1}', 200, {"ETag": server.etag})
+
+        body = server.body
+        start, end = 0, len(body)
+        status = 200
+        byte_range = self.headers.get("Range")
+        if byte_range and self.headers.get("If-Range") in (None, server.etag):
+            first, last = byte_range.split("=")[1].split("-")
+            start, end = int(first), int(last) + 1 if last else len(body)
+            status = 206
+        headers = {"ETag": server.etag, "Accept-Ranges": "bytes"}
+        if status == 206:
+            headers["Content-Range"] = "bytes {}-{}/{}".format(start, end - 1, len(body))
+        self.send_body(body[start:end], status, headers)
+
+    def send_body(self, body, status, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.server.drops and len(body) > 1024:
+            # Cut the connection partway through the body
+            self.server.drops -= 1
+            self.wfile.write(body[:len(body) // 3])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        self.wfile.write(body)
+
+@unittest.skipIf(sys.version_info < (3, 0), "the test server needs Python 3")
+class TestResourceFetcher(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp, True)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.requests = []
+        self.server.body = os.urandom(64 * 1024 + 123)
+        self.server.etag = '"v1"'
+        self.server.drops = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self.fetcher = resource_fetcher.ResourceFetcher()
+        self.fetcher.http_cache = file_cache.FileCache(os.path.join(self.temp, "Cache"))
+        self.destination = os.path.join(self.temp, "file.bin")
+
+    def tearDown(self):
+        with resource_fetcher.ResourceFetcher.pool_lock:
+            idle = resource_fetcher.ResourceFetcher.idle_connections.pop(("http", self.base_url.split("//")[1]), [])
+        for connection in idle:
+            connection.close()
+
+    def read_destination(self):
+        with open(self.destination, "rb") as f:
+            return f.read()
+
+    def test_resumed_download_matches_source(self):
+        self.server.drops = 1
+        self.assertTrue(self.fetcher.download_and_save_file(self.base_url + "/file", self.destination, progress_callback=lambda *args: None))
+        self.assertEqual(self.read_destination(), self.server.body)
+        self.assertFalse(os.path.exists(self.destination + ".part"))
+        # The second request picked up where the first one was cut off
+        resumed = self.server.requests[-1][1]
+        self.assertEqual(resumed.get("If-Range"), self.server.etag)
+        self.assertEqual(resumed.get("Range"), "bytes={}-".format(len(self.server.body) // 3))
+
+    def test_segmented_download_matches_source(self):
+        self.server.drops = 2
+        with mock.patch.object(resource_fetcher, "SEGMENT_THRESHOLD", 1024):
+            self.assertTrue(self.fetcher.download_and_save_file(self.base_url + "/file", self.destination, progress_callback=lambda *args: None))
+        self.assertEqual(self.read_destination(), self.server.body)
+        ranges = [headers.get("Range") for path, headers in self.server.requests if headers.get("Range")]
+        self.assertGreaterEqual(len(ranges), resource_fetcher.MAX_SEGMENTS)
+
+    def test_cached_content_is_revalidated(self):
+        self.fetcher.cache_ttl = 0
+        self.assertEqual(self.fetcher.fetch_and_parse_content(self.base_url + "/json", "json"), {"a": 1})
+        self.assertEqual(self.fetcher.fetch_and_parse_content(self.base_url + "/json", "json"), {"a": 1})
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[-1][1].get("If-None-Match"), self.server.etag)
+        # Inside the TTL the cached copy is used without asking again
+        self.fetcher.cache_ttl = 60
+        self.assertEqual(self.fetcher.fetch_and_parse_content(self.base_url + "/json", "json"), {"a": 1})
+        self.assertEqual(len(self.server.requests), 2)
+
+if __name__ == "__main__":
+    unittest.main()